@@ -1,6 +1,6 @@
 """
 数据库配置文件
-包含MySQL和向量数据库的连接配置
+包含MySQL/SQLite和向量数据库的连接配置
 """
 
 import os
@@ -12,6 +12,13 @@ load_dotenv()
 class DatabaseConfig:
     """数据库配置类"""
     
+    # 数据库后端：mysql（默认）或 sqlite（嵌入式，无需MySQL服务）
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+
+    # SQLite配置：数据库文件，以及数据库为空时加载的名录CSV
+    SQLITE_PATH = os.getenv('SQLITE_PATH', './data/hazardous_chemicals.db')
+    SQLITE_CSV_PATH = os.getenv('SQLITE_CSV_PATH', './data/raw/hazardous_chemicals_catalog.csv')
+
     # MySQL配置
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
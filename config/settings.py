@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# 项目根目录（数据文件的相对路径按项目根目录解析，与当前工作目录无关）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Settings:
     """系统设置类"""
     
@@ -22,23 +25,58 @@ class Settings:
     
     # 查询设置
     DEFAULT_SEARCH_LIMIT = int(os.getenv('DEFAULT_SEARCH_LIMIT', 10))
+    # 查询分析使用的关键词、同义词扩展规则和意图后缀数据文件（相对路径按项目根目录解析）
+    QUERY_KEYWORDS_FILE = os.path.join(PROJECT_ROOT, os.getenv('QUERY_KEYWORDS_FILE',
+                                                               os.path.join('config', 'query_keywords.json')))
 
     # 向量数据库配置
     VECTOR_DB_PATH = os.getenv('VECTOR_DB_PATH', './data/vector_db')
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
     VECTOR_COLLECTION_NAME = os.getenv('VECTOR_COLLECTION_NAME', 'hazardous_chemicals')
+    # 索引模式：sparse（倒排稀疏索引，默认）或 dense（FAISS稠密索引）
+    VECTOR_INDEX_MODE = os.getenv('VECTOR_INDEX_MODE', 'sparse').lower()
+    # dense模式下的FAISS索引类型（index factory字符串），如 Flat、IVF256,Flat、HNSW32、IVF256,PQ16、OPQ16_64,IVF256,PQ16
+    # （PQ要求维度是M的倍数，不满足时向量自动补零；语料太少时IVF/PQ的训练样本不足，应使用Flat）
+    FAISS_INDEX_FACTORY = os.getenv('FAISS_INDEX_FACTORY', 'Flat')
+    # 查询时参数：IVF索引探测的聚类数、HNSW索引的搜索宽度
+    FAISS_NPROBE = int(os.getenv('FAISS_NPROBE', 16))
+    FAISS_EF_SEARCH = int(os.getenv('FAISS_EF_SEARCH', 64))
 
     # 文本处理配置
     MAX_CHUNK_SIZE = int(os.getenv('MAX_CHUNK_SIZE', 500))
     CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', 50))
 
+    # 分词配置：构建索引时的分词进程数，以及是否按内容哈希缓存分词结果
+    TOKENIZER_WORKERS = int(os.getenv('TOKENIZER_WORKERS', os.cpu_count() or 1))
+    TOKEN_CACHE_ENABLED = os.getenv('TOKEN_CACHE_ENABLED', 'True').lower() == 'true'
+
     # 检索配置
     RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', 50))  # 增加默认返回数量
     SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', 0.1))
+
+    # 向量检索缓存配置（查询向量和检索结果各自的容量，TTL单位为秒）
+    VECTOR_CACHE_SIZE = int(os.getenv('VECTOR_CACHE_SIZE', 2048))
+    VECTOR_CACHE_TTL = float(os.getenv('VECTOR_CACHE_TTL', 3600))
+    
+    # 检索结果缓存配置：缓存 retrieve() 的结果（TTL单位为秒），名录数据版本的轮询间隔（秒）
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_TTL = float(os.getenv('CACHE_TTL', 3600))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv('RETRIEVAL_CACHE_SIZE', 1024))
+    CACHE_VERSION_CHECK_INTERVAL = float(os.getenv('CACHE_VERSION_CHECK_INTERVAL', 5))
+
+    # 检索指标：记录各阶段耗时并按 阶段 + 检索策略 汇总延迟直方图（见 get_retrieval_stats() 的 metrics）
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+
+    # 法规关联表：构建向量数据库时预先计算化学品的相关法规，查询时直接查表
+    REGULATION_LINKS_ENABLED = os.getenv('REGULATION_LINKS_ENABLED', 'True').lower() == 'true'
+
+    # 名录只读副本配置：启用后精确查询、名称搜索和统计在进程内完成，按间隔（秒）轮询数据版本刷新
+    CATALOG_REPLICA_ENABLED = os.getenv('CATALOG_REPLICA_ENABLED', 'False').lower() == 'true'
+    CATALOG_REPLICA_REFRESH_INTERVAL = float(os.getenv('CATALOG_REPLICA_REFRESH_INTERVAL', 60))
     
     # 数据处理设置
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', 100))
-    MAX_WORKERS = int(os.getenv('MAX_WORKERS', 4))
+    MAX_WORKERS = int(os.getenv('MAX_WORKERS', 4))  # 检索线程池大小，精确搜索与语义搜索并行执行
     
     @classmethod
     def get_log_config(cls):
@@ -56,6 +94,8 @@ class Settings:
             'path': cls.VECTOR_DB_PATH,
             'embedding_model': cls.EMBEDDING_MODEL,
             'collection_name': cls.VECTOR_COLLECTION_NAME,
+            'index_mode': cls.VECTOR_INDEX_MODE,
+            'index_factory': cls.FAISS_INDEX_FACTORY,
             'max_chunk_size': cls.MAX_CHUNK_SIZE,
             'chunk_overlap': cls.CHUNK_OVERLAP,
             'retrieval_top_k': cls.RETRIEVAL_TOP_K,
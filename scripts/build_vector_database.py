@@ -16,6 +16,7 @@ sys.path.append(str(project_root))
 from loguru import logger
 from src.database.mysql_handler import MySQLHandler
 from src.vector_db.chroma_handler import VectorHandler
+from src.retrieval.regulation_links import RegulationLinks
 from config.settings import Settings
 
 
@@ -125,8 +126,19 @@ def build_vector_database(reset_existing: bool = False):
                 logger.warning("⚠️ Markdown文档导入失败，但MySQL数据已成功导入")
         else:
             logger.warning(f"⚠️ 未找到附录A文档: {markdown_file}")
+
+        # 8. 合并段并持久化完整索引
+        logger.info("🗜️ 合并向量数据库段...")
+        vector_handler.compact()
+
+        # 9. 预计算化学品法规关联表
+        logger.info("🔗 预计算化学品法规关联表...")
+        links = RegulationLinks.build(vector_handler, mysql_handler.iter_chemicals(
+            columns=['un_number', 'chinese_name', 'category', 'special_provisions']))
+        if not links.save(vector_handler.regulation_links_path):
+            logger.warning("⚠️ 法规关联表保存失败，查询时将实时检索相关法规")
         
-        # 8. 验证构建结果
+        # 10. 验证构建结果
         final_stats = vector_handler.get_collection_stats()
         total_docs = final_stats.get('total_documents', 0)
         
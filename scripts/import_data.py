@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+名录数据导入脚本
+按块流式读取危险化学品名录CSV，批量写入MySQL，已存在的记录按 (UN编号, 包装类别) 更新
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from loguru import logger
+from src.database.mysql_handler import MySQLHandler
+from src.data_processing.catalog_csv import iter_csv_chemicals
+from config.settings import Settings
+
+
+DEFAULT_CSV = project_root / "data" / "raw" / "hazardous_chemicals_catalog.csv"
+
+
+def setup_logging():
+    """设置日志"""
+    log_config = Settings.get_log_config()
+
+    # 确保日志目录存在
+    log_dir = Path(log_config['file']).parent
+    log_dir.mkdir(exist_ok=True)
+
+    # 配置loguru
+    logger.remove()  # 移除默认处理器
+    logger.add(
+        sys.stdout,
+        level=log_config['level'],
+        format=log_config['format']
+    )
+    logger.add(
+        log_config['file'],
+        level=log_config['level'],
+        format=log_config['format'],
+        rotation="10 MB"
+    )
+
+
+def import_csv(csv_file: str, chunk_size: int = 1000, update_existing: bool = True) -> bool:
+    """
+    导入名录CSV
+
+    Args:
+        csv_file: CSV文件路径
+        chunk_size: 每批写入的行数
+        update_existing: 是否更新已存在的记录
+    """
+    start_time = time.time()
+
+    try:
+        mysql_handler = MySQLHandler()
+        mysql_handler.create_tables()
+
+        state = mysql_handler.begin_upsert()
+        totals = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        total_rows = 0
+
+        logger.info(f"📥 开始导入: {csv_file}（每批 {chunk_size} 行）")
+        for chunk_number, chemicals in enumerate(iter_csv_chemicals(csv_file, chunk_size), 1):
+            chunk_start = time.time()
+            stats = mysql_handler.bulk_upsert_chemicals(chemicals, update_existing, state)
+            elapsed = max(time.time() - chunk_start, 1e-6)
+
+            total_rows += len(chemicals)
+            for key, value in stats.items():
+                totals[key] += value
+
+            logger.info(f"第 {chunk_number} 批: {len(chemicals)} 行，新增 {stats['inserted']}，"
+                        f"更新 {stats['updated']}，未变化 {stats['unchanged']}，跳过 {stats['skipped']}，"
+                        f"{len(chemicals) / elapsed:.0f} 行/秒")
+
+        elapsed_time = max(time.time() - start_time, 1e-6)
+        logger.info(f"🎉 导入完成！共 {total_rows} 行，新增 {totals['inserted']}，更新 {totals['updated']}，"
+                    f"未变化 {totals['unchanged']}，跳过 {totals['skipped']}")
+        logger.info(f"⏱️ 耗时: {elapsed_time:.2f} 秒（{total_rows / elapsed_time:.0f} 行/秒）")
+        return totals['skipped'] == 0
+
+    except Exception as e:
+        logger.error(f"❌ 导入数据时发生错误: {e}")
+        return False
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='危险化学品名录数据导入工具')
+    parser.add_argument('--csv', default=str(DEFAULT_CSV), help='名录CSV文件路径')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每批写入的行数（默认1000）')
+    parser.add_argument('--insert-only', action='store_true', help='只插入新记录，不更新已存在的记录')
+
+    args = parser.parse_args()
+    setup_logging()
+
+    if not Path(args.csv).exists():
+        logger.error(f"❌ 文件不存在: {args.csv}")
+        sys.exit(1)
+
+    if not import_csv(args.csv, args.chunk_size, not args.insert_only):
+        logger.error("💥 导入未完全成功，请检查错误信息")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
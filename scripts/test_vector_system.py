@@ -107,6 +107,16 @@ def test_query_performance():
     logger.info(f"   平均结果数量: {avg_results:.1f}")
     logger.info(f"   总查询时间: {total_time:.3f}s")
 
+    # 各阶段耗时分布
+    stage_metrics = retriever.get_retrieval_stats().get('metrics', {}).get('stages', {})
+    if stage_metrics:
+        logger.info(f"\n⏱️ 各阶段耗时（auto策略）:")
+        for stage, by_strategy in stage_metrics.items():
+            stage_stats = by_strategy.get('auto')
+            if stage_stats:
+                logger.info(f"   {stage:28} {stage_stats['count']:4d} 次  p50 {stage_stats['p50_ms']:8.2f}ms  "
+                            f"p95 {stage_stats['p95_ms']:8.2f}ms  p99 {stage_stats['p99_ms']:8.2f}ms")
+
 
 def test_edge_cases():
     """测试边界情况"""
@@ -189,7 +199,9 @@ def interactive_test():
                 continue
 
             # 使用默认设置：auto策略，返回更多结果，不显示详细流程
-            result = retriever.retrieve(query, strategy='auto', top_k=50, verbose=False)
+            # 按页检索，只为显示的记录生成内容和查找相关法规
+            display_limit = 10  # 默认显示前10条
+            result = retriever.retrieve(query, strategy='auto', top_k=50, verbose=False, page_size=display_limit)
 
             # 处理结构化结果格式
             chemical_data = result.get('chemical_data', [])
@@ -197,12 +209,11 @@ def interactive_test():
 
             # 显示化学品数据
             if chemical_data:
-                total_chemicals = len(chemical_data)
+                total_chemicals = result.get('total_chemicals', len(chemical_data))
                 print(f"\n📊 1. 从数据库中查找到的数据 ({total_chemicals} 条):")
                 print("-" * 60)
 
                 # 如果结果过多，询问用户是否要查看全部
-                display_limit = 10  # 默认显示前10条
                 show_all = False
 
                 if total_chemicals > display_limit:
@@ -211,6 +222,18 @@ def interactive_test():
                     if user_choice in ['y', 'yes', '是']:
                         show_all = True
                         display_limit = total_chemicals
+
+                        # 继续读取后续各页
+                        regulation_ids = {reg.get('metadata', {}).get('id') for reg in regulations}
+                        next_cursor = result.get('next_cursor')
+                        while next_cursor:
+                            page = retriever.retrieve(query, cursor=next_cursor)
+                            chemical_data.extend(page.get('chemical_data', []))
+                            for reg in page.get('regulations', []):
+                                if reg.get('metadata', {}).get('id') not in regulation_ids:
+                                    regulation_ids.add(reg.get('metadata', {}).get('id'))
+                                    regulations.append(reg)
+                            next_cursor = page.get('next_cursor')
                     print()
                 else:
                     show_all = True
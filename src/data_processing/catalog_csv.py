@@ -0,0 +1,57 @@
+"""
+名录CSV读取模块
+按块流式读取导出的危险化学品名录CSV（中文列名或字段名均可），
+转换为与 MySQLHandler.get_all_chemicals 一致的记录格式
+"""
+
+from datetime import datetime
+from typing import List, Dict, Any, Iterator
+
+import pandas as pd
+
+from src.database.mysql_handler import CHEMICAL_COLUMNS
+
+
+def iter_csv_chemicals(csv_path: str, chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    按块读取名录CSV
+
+    Args:
+        csv_path: CSV文件路径
+        chunk_size: 每块的行数
+
+    Yields:
+        每块的化学品记录列表
+    """
+    # 同时接受中文列名和字段名
+    columns = {name: key for key, name in CHEMICAL_COLUMNS.items()}
+    columns.update({key: key for key in CHEMICAL_COLUMNS})
+
+    reader = pd.read_csv(csv_path, encoding='utf-8-sig', dtype=str, keep_default_na=False, chunksize=chunk_size)
+    for df in reader:
+        chunk = []
+        for row in df.to_dict('records'):
+            chemical = {key: None for key in CHEMICAL_COLUMNS}
+            for name, value in row.items():
+                if name in columns:
+                    chemical[columns[name]] = value.strip() or None
+            for key in ('id', 'un_number'):
+                if chemical[key] is not None and chemical[key].isdigit():
+                    chemical[key] = int(chemical[key])
+            for key in ('created_at', 'updated_at'):
+                if chemical[key] is not None:
+                    chemical[key] = _to_isoformat(chemical[key])
+            chunk.append(chemical)
+        yield chunk
+
+
+def load_csv_chemicals(csv_path: str) -> List[Dict[str, Any]]:
+    """读取整个名录CSV"""
+    return [chemical for chunk in iter_csv_chemicals(csv_path) for chemical in chunk]
+
+
+def _to_isoformat(value: str) -> str:
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return value
@@ -4,11 +4,22 @@
 """
 
 import re
-import jieba
 import markdown
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional
 from loguru import logger
 from config.settings import Settings
+from src.data_processing.tokenizer import tokenize
+
+
+# 构建化学品文档及其元数据所需的字段
+CHEMICAL_DOCUMENT_FIELDS = (
+    'un_number', 'chinese_name', 'english_name', 'category', 'secondary_hazard', 'packaging_group',
+    'special_provisions', 'limited_quantity', 'excepted_quantity', 'packaging_instruction',
+    'packaging_special_provision', 'portable_tank_instruction', 'portable_tank_special_provision'
+)
+
+# 附录A中特殊规定段落的开头编号
+PROVISION_NUMBER_PATTERN = re.compile(r'\s*(\d+)\s+')
 
 
 class TextProcessor:
@@ -91,19 +102,25 @@ class TextProcessor:
             documents = []
             for i, section in enumerate(sections):
                 if section.strip():
+                    # 特殊规定段落以编号开头，同一段落的所有块共享该编号
+                    provision_number = self.extract_provision_number(section)
+
                     # 进一步分块
                     chunks = self._split_text_into_chunks(section)
                     
                     for j, chunk in enumerate(chunks):
                         if len(chunk.strip()) > 50:  # 过滤太短的块
+                            metadata = {
+                                'source': 'appendix_a',
+                                'section_id': i,
+                                'chunk_id': j,
+                                'doc_type': 'regulation'
+                            }
+                            if provision_number is not None:
+                                metadata['provision_number'] = provision_number
                             documents.append({
                                 'content': chunk.strip(),
-                                'metadata': {
-                                    'source': 'appendix_a',
-                                    'section_id': i,
-                                    'chunk_id': j,
-                                    'doc_type': 'regulation'
-                                }
+                                'metadata': metadata
                             })
             
             logger.info(f"处理Markdown内容完成，生成 {len(documents)} 个文档块")
@@ -113,6 +130,12 @@ class TextProcessor:
             logger.error(f"处理Markdown内容失败: {e}")
             return []
     
+    @staticmethod
+    def extract_provision_number(section: str) -> Optional[int]:
+        """提取特殊规定段落开头的编号（如 "188 交付运输的电池..." -> 188）"""
+        match = PROVISION_NUMBER_PATTERN.match(section)
+        return int(match.group(1)) if match else None
+
     def _split_by_sections(self, text: str) -> List[str]:
         """按章节分割文本"""
         # 按照数字编号分割（如 "16 新的或现有的爆炸性物质"）
@@ -179,17 +202,8 @@ class TextProcessor:
     def extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
         try:
-            # 使用jieba分词
-            words = jieba.cut(text)
-            
-            # 过滤停用词和短词
-            keywords = []
-            for word in words:
-                word = word.strip()
-                if len(word) > 1 and word not in ['的', '是', '在', '有', '和', '或', '等', '及']:
-                    keywords.append(word)
-            
-            return keywords[:10]  # 返回前10个关键词
+            # 使用jieba分词并过滤停用词和短词
+            return tokenize(text)[:10]  # 返回前10个关键词
             
         except Exception as e:
             logger.error(f"提取关键词失败: {e}")
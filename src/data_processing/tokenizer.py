@@ -0,0 +1,126 @@
+"""
+中文分词模块
+提供jieba分词、按内容哈希持久化的分词缓存，以及构建索引时的多进程并行分词
+"""
+
+import os
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Sequence
+
+import jieba
+from loguru import logger
+
+
+# 停用词
+STOP_WORDS = {'的', '是', '在', '有', '和', '或', '等', '及'}
+
+# 分词规则版本，规则变化时旧缓存自动失效
+TOKENIZER_VERSION = 1
+
+# 待分词文档少于该数量时不启用多进程
+PARALLEL_MIN_DOCUMENTS = 500
+
+# 每个子进程任务包含的文档数量
+PARALLEL_CHUNK_SIZE = 200
+
+
+def tokenize(text: str) -> List[str]:
+    """中文分词：jieba切分后过滤短词和停用词"""
+    words = (word.strip() for word in jieba.cut(text))
+    return [word for word in words if len(word) > 1 and word not in STOP_WORDS]
+
+
+def _tokenize_chunk(texts: List[str]) -> List[List[str]]:
+    """子进程中批量分词"""
+    return [tokenize(text) for text in texts]
+
+
+def content_hash(text: str) -> bytes:
+    """文本内容哈希，用作分词缓存键"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class TokenCache:
+    """按内容哈希缓存分词结果，追加写入磁盘，未变化的文本无需重新分词"""
+
+    def __init__(self, path: Optional[str] = None, workers: int = 1):
+        self.path = path
+        self.workers = max(1, workers)
+        self._tokens: Dict[bytes, List[str]] = {}
+        self._unsaved: Dict[bytes, List[str]] = {}
+        self._load()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _load(self):
+        """读取磁盘上的缓存（文件由多个追加写入的记录组成）"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'rb') as f:
+                header = pickle.load(f)
+                if header.get('version') == TOKENIZER_VERSION:
+                    while True:
+                        try:
+                            self._tokens.update(pickle.load(f))
+                        except EOFError:
+                            return
+        except Exception as e:
+            logger.warning(f"读取分词缓存失败，将重新分词: {e}")
+            self._tokens = {}
+
+        # 版本不一致或文件损坏时丢弃旧缓存
+        logger.info("丢弃旧的分词缓存")
+        os.remove(self.path)
+
+    def get(self, text: str) -> Optional[List[str]]:
+        """读取缓存的分词结果（不写入缓存）"""
+        return self._tokens.get(content_hash(text))
+
+    def prefetch(self, texts: Sequence[str]) -> int:
+        """为未缓存的文本分词并写入缓存，返回新分词的文档数量"""
+        missing = {}
+        for text in texts:
+            key = content_hash(text)
+            if key not in self._tokens and key not in missing:
+                missing[key] = text
+        if not missing:
+            return 0
+
+        keys, pending_texts = list(missing), list(missing.values())
+        if self.workers > 1 and len(pending_texts) >= PARALLEL_MIN_DOCUMENTS:
+            logger.info(f"使用 {self.workers} 个进程并行分词，待分词文档: {len(pending_texts)}")
+            # 先在主进程加载词典，fork出的子进程可直接复用
+            jieba.initialize()
+            chunks = [pending_texts[i:i + PARALLEL_CHUNK_SIZE]
+                      for i in range(0, len(pending_texts), PARALLEL_CHUNK_SIZE)]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                token_lists = [tokens for chunk in executor.map(_tokenize_chunk, chunks) for tokens in chunk]
+        else:
+            token_lists = _tokenize_chunk(pending_texts)
+
+        for key, tokens in zip(keys, token_lists):
+            self._tokens[key] = tokens
+            self._unsaved[key] = tokens
+
+        logger.info(f"分词完成，新分词 {len(keys)} 个文档，缓存命中 {len(texts) - len(keys)} 个")
+        return len(keys)
+
+    def save(self):
+        """将新增的分词结果追加写入磁盘"""
+        if not self.path or not self._unsaved:
+            return
+
+        try:
+            is_new = not os.path.exists(self.path)
+            with open(self.path, 'ab') as f:
+                if is_new:
+                    pickle.dump({'version': TOKENIZER_VERSION}, f)
+                pickle.dump(self._unsaved, f)
+            self._unsaved = {}
+        except Exception as e:
+            logger.warning(f"保存分词缓存失败: {e}")
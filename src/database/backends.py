@@ -0,0 +1,136 @@
+"""
+数据库后端模块
+MySQLHandler 的查询方法通过后端对象处理方言差异：
+MySQL为默认后端；SQLite为嵌入式后端，首次使用时从名录CSV加载数据，名称搜索使用FTS5 trigram索引
+"""
+
+import os
+from typing import Dict, Any
+
+from sqlalchemy import create_engine, text, column
+from loguru import logger
+
+from config.database import DatabaseConfig
+
+
+class MySQLBackend:
+    """MySQL后端"""
+
+    name = 'mysql'
+
+    def create_engine(self):
+        return create_engine(
+            DatabaseConfig.get_mysql_url(),
+            echo=False,  # 设置为True可以看到SQL语句
+            pool_pre_ping=True,
+            pool_recycle=3600
+        )
+
+    def prepare(self, handler):
+        """连接后的初始化（MySQL的表结构和数据由部署时导入）"""
+
+    def name_filter(self, model, name: str):
+        """名称子串搜索条件"""
+        return model.chinese_name.like(f'%{name}%')
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name}
+
+
+class SQLiteBackend:
+    """嵌入式SQLite后端"""
+
+    name = 'sqlite'
+
+    # 名称全文索引（外部内容表，与名录表通过触发器同步）
+    FTS_TABLE = 'chemical_names_fts'
+
+    # trigram索引只能处理不少于3个字符的子串，更短的查询直接扫描名录表
+    FTS_MIN_QUERY_LENGTH = 3
+
+    def __init__(self, path: str, csv_path: str = None):
+        self.path = path
+        self.csv_path = csv_path
+        self.fts_enabled = False
+
+    def create_engine(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return create_engine(
+            f"sqlite:///{self.path}",
+            echo=False,
+            connect_args={'check_same_thread': False}
+        )
+
+    def prepare(self, handler):
+        """建表、建立名称全文索引，名录为空时从CSV加载"""
+        handler.create_tables()
+        self.fts_enabled = self._create_fts(handler.engine, handler.table_name)
+
+        if self.csv_path and os.path.exists(self.csv_path) and handler.get_statistics().get('total_chemicals') == 0:
+            from src.data_processing.catalog_csv import iter_csv_chemicals
+
+            logger.info(f"SQLite名录为空，从CSV加载: {self.csv_path}")
+            state = handler.begin_upsert()
+            inserted = 0
+            for chemicals in iter_csv_chemicals(self.csv_path):
+                inserted += handler.bulk_upsert_chemicals(chemicals, state=state)['inserted']
+            logger.info(f"SQLite名录加载完成，共 {inserted} 条记录")
+
+    def _create_fts(self, engine, table_name: str) -> bool:
+        """创建FTS5 trigram名称索引及同步触发器，SQLite不支持时返回False"""
+        columns = '"名称和说明", "英文名称和说明"'
+        new_values = 'new."名称和说明", new."英文名称和说明"'
+        old_values = 'old."名称和说明", old."英文名称和说明"'
+        fts = self.FTS_TABLE
+
+        try:
+            with engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': fts}
+                ).first()
+
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+                    f"content='{table_name}', content_rowid='id', tokenize='trigram')"))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"))
+                connection.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table_name} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                    f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"))
+
+                # 索引建立前已有的数据需要重建一次
+                if not exists:
+                    connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            return True
+
+        except Exception as e:
+            logger.warning(f"SQLite不支持FTS5 trigram，名称搜索将使用LIKE扫描: {e}")
+            return False
+
+    def name_filter(self, model, name: str):
+        """名称子串搜索条件（足够长的查询走FTS5 trigram索引）"""
+        if not self.fts_enabled or len(name) < self.FTS_MIN_QUERY_LENGTH:
+            return model.chinese_name.like(f'%{name}%')
+
+        matches = text(f'SELECT rowid FROM {self.FTS_TABLE} WHERE "名称和说明" LIKE :name_pattern') \
+            .bindparams(name_pattern=f'%{name}%').columns(column('rowid'))
+        return model.id.in_(matches)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'path': self.path, 'fts_enabled': self.fts_enabled}
+
+
+def get_backend():
+    """按配置创建数据库后端"""
+    if DatabaseConfig.DB_BACKEND == 'sqlite':
+        return SQLiteBackend(DatabaseConfig.SQLITE_PATH, DatabaseConfig.SQLITE_CSV_PATH)
+    if DatabaseConfig.DB_BACKEND != 'mysql':
+        raise ValueError(f"不支持的数据库后端: {DatabaseConfig.DB_BACKEND}")
+    return MySQLBackend()
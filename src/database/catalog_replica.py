@@ -0,0 +1,236 @@
+"""
+名录只读副本模块
+将整个危险化学品名录表加载到进程内存中，以紧凑记录 + 哈希索引的形式提供与MySQLHandler一致的只读查询，
+并通过轮询数据版本（记录数与最大更新时间）自动刷新
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Sequence, Callable, Union
+
+import numpy as np
+from loguru import logger
+
+from src.database.mysql_handler import CHEMICAL_COLUMNS
+from src.database.code_index import CodeIndex
+from src.database.ngram_index import NgramIndex
+from src.data_processing.catalog_csv import load_csv_chemicals
+
+
+# 记录字段（与 MySQLHandler._chemical_to_dict 的键一致）
+FIELDS = tuple(CHEMICAL_COLUMNS)
+
+# 建立哈希索引的字段
+INDEXED_FIELDS = ('un_number', 'category', 'packaging_group', 'secondary_hazard')
+
+
+class _CatalogSnapshot:
+    """某一数据版本的名录快照（构建后只读）"""
+
+    def __init__(self, chemicals: List[Dict[str, Any]], version: Any):
+        self.version = version
+        self.loaded_at = time.time()
+        # 紧凑记录：按FIELDS顺序保存的元组
+        self.records = [tuple(chemical.get(field) for field in FIELDS) for chemical in chemicals]
+        # 中英文名称的n-gram倒排索引
+        self.name_index = NgramIndex([(chemical.get('chinese_name'), chemical.get('english_name'))
+                                      for chemical in chemicals])
+
+        # 哈希索引：字段值 -> 记录位置数组
+        self.indexes = {}
+        for field in INDEXED_FIELDS:
+            positions = {}
+            for position, chemical in enumerate(chemicals):
+                positions.setdefault(chemical.get(field), []).append(position)
+            self.indexes[field] = {value: np.asarray(items, dtype=np.int32) for value, items in positions.items()}
+
+        self._code_index = None
+
+    def to_dict(self, position: int) -> Dict[str, Any]:
+        return dict(zip(FIELDS, self.records[position]))
+
+    def code_index(self) -> CodeIndex:
+        if self._code_index is None:
+            self._code_index = CodeIndex([self.to_dict(i) for i in range(len(self.records))])
+        return self._code_index
+
+
+class CatalogReplica:
+    """名录表的进程内只读副本"""
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]],
+                 version_getter: Optional[Callable[[], Any]] = None,
+                 refresh_interval: float = 60.0):
+        """
+        Args:
+            loader: 加载全部名录记录的函数
+            version_getter: 读取数据版本的函数，返回值变化时重新加载；为None时只加载一次
+            refresh_interval: 轮询数据版本的最小间隔（秒）
+        """
+        self._loader = loader
+        self._version_getter = version_getter
+        self.refresh_interval = refresh_interval
+
+        self._snapshot: Optional[_CatalogSnapshot] = None
+        self._stale = True
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @classmethod
+    def from_handler(cls, mysql_handler, refresh_interval: float = 60.0) -> 'CatalogReplica':
+        """从MySQL加载，按 记录数 + MAX(更新时间) 轮询刷新"""
+        return cls(mysql_handler.get_all_chemicals, mysql_handler.get_catalog_version, refresh_interval)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, refresh_interval: float = 60.0) -> 'CatalogReplica':
+        """从导出的CSV文件加载，按文件修改时间轮询刷新"""
+        return cls(lambda: load_csv_chemicals(csv_path),
+                   lambda: os.path.getmtime(csv_path) if os.path.exists(csv_path) else None,
+                   refresh_interval)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        检查数据版本，版本变化（或force）时重新加载
+
+        Returns:
+            副本当前是否可用
+        """
+        # 其他线程正在刷新时直接使用当前状态
+        if not self._lock.acquire(blocking=False):
+            return self._snapshot is not None and not self._stale
+
+        try:
+            self._checked_at = time.monotonic()
+            version = self._version_getter() if self._version_getter else None
+            if self._version_getter and version is None:
+                raise RuntimeError("无法读取名录数据版本")
+
+            snapshot = self._snapshot
+            if force or snapshot is None or version != snapshot.version:
+                self._snapshot = _CatalogSnapshot(self._loader(), version)
+                self.reloads += 1
+                logger.info(f"名录副本加载完成，共 {len(self._snapshot.records)} 条记录")
+
+            self._stale = False
+
+        except Exception as e:
+            logger.warning(f"刷新名录副本失败，将回退到数据库查询: {e}")
+            self._stale = True
+
+        finally:
+            self._lock.release()
+
+        return self._snapshot is not None and not self._stale
+
+    def is_fresh(self) -> bool:
+        """副本是否可用（到达轮询间隔时先检查数据版本）"""
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.refresh_interval:
+            return self.refresh()
+        return self._snapshot is not None and not self._stale
+
+    @property
+    def version(self) -> Any:
+        """当前快照对应的数据版本"""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else None
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot.records) if snapshot else 0
+
+    def query_by_field(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """按索引字段等值查询"""
+        snapshot = self._require_snapshot()
+        if field not in snapshot.indexes:
+            raise ValueError(f"字段未建立索引: {field}")
+        return [snapshot.to_dict(position) for position in snapshot.indexes[field].get(value, [])]
+
+    def query_by_un_number(self, un_number: int) -> List[Dict[str, Any]]:
+        """根据UN编号查询化学品"""
+        try:
+            return self.query_by_field('un_number', int(un_number))
+        except Exception as e:
+            logger.error(f"副本查询UN编号 {un_number} 失败: {e}")
+            return []
+
+    def query_by_un_numbers(self, un_numbers: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """批量根据UN编号查询化学品，返回 UN编号 -> 记录列表"""
+        un_numbers = list(dict.fromkeys(int(un_number) for un_number in un_numbers))
+        try:
+            return {un_number: self.query_by_field('un_number', un_number) for un_number in un_numbers}
+        except Exception as e:
+            logger.error(f"副本批量查询UN编号失败: {e}")
+            return {un_number: [] for un_number in un_numbers}
+
+    def search_by_name(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """根据名称子串搜索化学品（匹配中文或英文名称，名称越接近查询词越靠前）"""
+        try:
+            snapshot = self._require_snapshot()
+            return [snapshot.to_dict(position) for position in snapshot.name_index.search(name, limit)]
+        except Exception as e:
+            logger.error(f"副本按名称搜索失败: {e}")
+            return []
+
+    def query_by_codes(self, field: str, codes: Iterable[Union[int, str]]) -> List[Dict[str, Any]]:
+        """按规定代码查询携带任一代码的化学品"""
+        try:
+            return self._require_snapshot().code_index().lookup(field, codes)
+        except Exception as e:
+            logger.error(f"副本按规定代码查询失败: {e}")
+            return []
+
+    def get_all_chemicals(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取所有化学品记录"""
+        try:
+            snapshot = self._require_snapshot()
+            count = len(snapshot.records) if not limit else min(limit, len(snapshot.records))
+            return [snapshot.to_dict(position) for position in range(count)]
+        except Exception as e:
+            logger.error(f"获取副本化学品记录失败: {e}")
+            return []
+
+    def iter_chemicals(self, columns: Optional[Sequence[str]] = None,
+                       batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """遍历化学品记录（只包含所选字段）"""
+        snapshot = self._require_snapshot()
+        columns = list(columns) if columns else list(FIELDS)
+        for position in range(len(snapshot.records)):
+            chemical = snapshot.to_dict(position)
+            yield {key: chemical[key] for key in columns}
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息（格式与 MySQLHandler.get_statistics 一致）"""
+        try:
+            snapshot = self._require_snapshot()
+            return {
+                'total_chemicals': len(snapshot.records),
+                'category_distribution': {value: len(positions)
+                                          for value, positions in snapshot.indexes['category'].items()},
+                'packaging_group_distribution': {value: len(positions)
+                                                 for value, positions in snapshot.indexes['packaging_group'].items()}
+            }
+        except Exception as e:
+            logger.error(f"获取副本统计信息失败: {e}")
+            return {}
+
+    def stats(self) -> Dict[str, Any]:
+        """副本状态"""
+        snapshot = self._snapshot
+        return {
+            'records': len(snapshot.records) if snapshot else 0,
+            'version': str(snapshot.version) if snapshot else None,
+            'loaded_at': datetime.fromtimestamp(snapshot.loaded_at).isoformat() if snapshot else None,
+            'stale': self._stale,
+            'reloads': self.reloads,
+            'refresh_interval': self.refresh_interval
+        }
+
+    def _require_snapshot(self) -> _CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("名录副本尚未加载")
+        return snapshot
+
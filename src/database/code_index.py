@@ -0,0 +1,122 @@
+"""
+规定代码倒排索引模块
+将名录中的特殊规定、包装指南、罐柜指南等自由文本列一次性解析为规范化代码，
+并建立 代码 -> 名录记录 的倒排索引，避免每次请求重复切分文本或使用LIKE扫描
+"""
+
+import re
+from typing import List, Dict, Any, Iterable, Optional, Union
+
+import numpy as np
+
+
+# 需要建立索引的代码列，值表示代码是否为纯数字编号
+CODE_FIELDS = {
+    'special_provisions': True,                 # 特殊规定，如 "61 274"
+    'packaging_instruction': False,             # 包装指南，如 "P112(a) P112(b)"、"P001 IBC02"
+    'packaging_special_provision': False,       # 特殊包装规定，如 "B2,B4"
+    'portable_tank_instruction': False,         # 可移动罐柜指南，如 "T6"
+    'portable_tank_special_provision': False,   # 可移动罐柜特殊规定，如 "TP2 TP27"
+}
+
+# 规定代码：可选的字母前缀 + 编号 + 可选的小写字母后缀，如 188、P112(a)、IBC02、TP33
+CODE_PATTERN = re.compile(r'^([A-Za-z]*\d+)(\([A-Za-z]\))?$')
+
+# 代码之间的分隔符
+CODE_SEPARATOR = re.compile(r'[\s,，、;；]+')
+
+
+def parse_codes(value: Optional[str], numeric: bool = False) -> List[Union[int, str]]:
+    """
+    将代码列文本解析为规范化代码列表（忽略"见《规章范本》..."等说明文字）
+
+    Args:
+        value: 列文本
+        numeric: 是否为纯数字编号列（特殊规定）
+
+    Returns:
+        去重后的代码列表，保持原有顺序
+    """
+    if not value:
+        return []
+
+    codes = []
+    for token in CODE_SEPARATOR.split(str(value).strip()):
+        match = CODE_PATTERN.match(token)
+        if not match:
+            continue
+        base, suffix = match.group(1).upper(), match.group(2)
+        if numeric:
+            if not base.isdigit() or suffix:
+                continue
+            code = int(base)
+        else:
+            code = base + suffix.lower() if suffix else base
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def normalize_code(code: Union[int, str], numeric: bool = False) -> Optional[Union[int, str]]:
+    """规范化单个查询代码，无法识别时返回None"""
+    codes = parse_codes(str(code), numeric)
+    return codes[0] if codes else None
+
+
+class CodeIndex:
+    """名录记录的规定代码倒排索引（只读，按需整体重建）"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        # 每列的倒排表：代码 -> 记录位置数组
+        self.postings: Dict[str, Dict[Union[int, str], np.ndarray]] = {}
+
+        for field, numeric in CODE_FIELDS.items():
+            postings = {}
+            for position, row in enumerate(rows):
+                # 先收集该记录的全部代码再登记，同一记录在每个代码下只登记一次
+                row_codes = {}
+                for code in parse_codes(row.get(field), numeric):
+                    row_codes[code] = None
+                    # 带分项后缀的包装指南（如P112(a)）同时登记到基础代码（P112）下
+                    if isinstance(code, str) and code.endswith(')'):
+                        row_codes[code[:-3]] = None
+                for code in row_codes:
+                    postings.setdefault(code, []).append(position)
+            self.postings[field] = {code: np.asarray(positions, dtype=np.int32)
+                                    for code, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def positions(self, field: str, codes: Iterable[Union[int, str]]) -> np.ndarray:
+        """查找携带任一代码的记录位置（升序去重）"""
+        if field not in CODE_FIELDS:
+            raise ValueError(f"不支持的代码列: {field}")
+
+        postings = self.postings[field]
+        matches = []
+        for code in codes:
+            code = normalize_code(code, CODE_FIELDS[field])
+            if code in postings:
+                matches.append(postings[code])
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+        if len(matches) == 1:
+            return matches[0]
+        return np.unique(np.concatenate(matches))
+
+    def lookup(self, field: str, codes: Iterable[Union[int, str]]) -> List[Dict[str, Any]]:
+        """查找携带任一代码的名录记录（按名录顺序）"""
+        return [dict(self.rows[position]) for position in self.positions(field, codes)]
+
+    def codes(self, field: str) -> List[Union[int, str]]:
+        """某列中出现过的所有代码"""
+        return sorted(self.postings[field])
+
+    def stats(self) -> Dict[str, Any]:
+        """索引统计信息"""
+        return {
+            'rows': len(self.rows),
+            'codes': {field: len(postings) for field, postings in self.postings.items()}
+        }
@@ -3,15 +3,20 @@ MySQL数据库处理模块
 负责危险化学品名录表的创建、数据操作和查询
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, TIMESTAMP, Index
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Index, inspect, select, insert, update, bindparam
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Sequence, Union, Tuple, Callable
 from loguru import logger
 import pandas as pd
+import threading
+import time
 
-from config.database import DatabaseConfig
+from config.settings import Settings
+from src.database.backends import get_backend
+from src.database.code_index import CodeIndex
+from src.database.ngram_index import NgramIndex
 
 Base = declarative_base()
 
@@ -51,27 +56,41 @@ class HazardousChemicalsCatalog(Base):
     )
 
 
+# 化学品字段名（与 _chemical_to_dict 的键一致） -> 数据库中文列名
+CHEMICAL_COLUMNS = {attr.key: attr.columns[0].name for attr in inspect(HazardousChemicalsCatalog).column_attrs}
+
+# 导入时写入的数据字段（自增ID和时间戳由数据库维护）
+DATA_FIELDS = tuple(key for key in CHEMICAL_COLUMNS if key not in ('id', 'created_at', 'updated_at'))
+
+# 批量导入时判断记录是否已存在的键
+UPSERT_KEY = ('un_number', 'packaging_group')
+
+
 class MySQLHandler:
-    """MySQL数据库处理器"""
+    """数据库处理器（默认连接MySQL，DB_BACKEND=sqlite 时使用嵌入式SQLite）"""
+
+    # 批量查询时单条 IN 语句包含的最大编号数量
+    IN_QUERY_BATCH_SIZE = 500
     
     def __init__(self):
         self.engine = None
         self.Session = None
+        self.backend = get_backend()
+        self.table_name = HazardousChemicalsCatalog.__tablename__
+        # 规定代码索引和名称索引：索引类型 -> (索引, 名录数据版本, 检查时间)，首次查询时构建，数据版本变化后重建
+        self._catalog_indexes: Dict[str, Tuple[Any, Any, float]] = {}
+        self._catalog_index_lock = threading.Lock()
         self.connect()
     
     def connect(self):
-        """连接到MySQL数据库"""
-        try:
-            self.engine = create_engine(
-                DatabaseConfig.get_mysql_url(),
-                echo=False,  # 设置为True可以看到SQL语句
-                pool_pre_ping=True,
-                pool_recycle=3600
-            )
+        """连接到数据库"""
+        try:
+            self.engine = self.backend.create_engine()
             self.Session = sessionmaker(bind=self.engine)
-            logger.info("MySQL数据库连接成功")
+            self.backend.prepare(self)
+            logger.info(f"{self.backend.name}数据库连接成功")
         except Exception as e:
-            logger.error(f"MySQL数据库连接失败: {e}")
+            logger.error(f"{self.backend.name}数据库连接失败: {e}")
             raise
     
     def create_tables(self):
@@ -99,6 +118,7 @@ class MySQLHandler:
             chemical = HazardousChemicalsCatalog(**chemical_data)
             session.add(chemical)
             session.commit()
+            self.invalidate_catalog_indexes()
             logger.debug(f"插入化学品记录成功: UN{chemical_data.get('un_number')}")
             return True
         except Exception as e:
@@ -124,6 +144,7 @@ class MySQLHandler:
                     continue
             
             session.commit()
+            self.invalidate_catalog_indexes()
             logger.info(f"批量插入完成，成功插入 {success_count} 条记录")
             return success_count
             
@@ -134,6 +155,98 @@ class MySQLHandler:
         finally:
             session.close()
     
+    def begin_upsert(self) -> Dict[str, Any]:
+        """
+        开始一次分批导入，返回在各批次之间共享的导入状态：
+        只有导入开始前已存在、且尚未被本次导入匹配过的记录才会被更新
+        """
+        session = self.Session()
+        try:
+            max_id = session.query(func.max(HazardousChemicalsCatalog.id)).scalar() or 0
+            return {'max_id': max_id, 'matched_ids': set()}
+        finally:
+            session.close()
+
+    def bulk_upsert_chemicals(self, chemicals_data: List[Dict[str, Any]], update_existing: bool = True,
+                              state: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        批量导入化学品记录（SQLAlchemy Core executemany），按 (UN编号, 包装类别) 更新已有记录
+
+        同一键出现多次时（名录中同一UN编号和包装类别可能对应多个条目），
+        第n条输入记录对应第n条已有记录，多出的输入记录作为新记录插入
+
+        Args:
+            chemicals_data: 化学品记录列表（键与 _chemical_to_dict 一致）
+            update_existing: 是否更新已有记录，为False时只插入新记录
+            state: begin_upsert() 返回的导入状态，分批导入时在各批次间共享
+
+        Returns:
+            统计信息：inserted / updated / unchanged / skipped
+        """
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        state = state if state is not None else self.begin_upsert()
+        table = HazardousChemicalsCatalog.__table__
+        columns = {key: table.c[name] for key, name in CHEMICAL_COLUMNS.items()}
+
+        rows = []
+        for chemical_data in chemicals_data:
+            try:
+                row = {key: chemical_data.get(key) for key in DATA_FIELDS}
+                row['un_number'] = int(row['un_number'])
+                rows.append(row)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"跳过无效记录: {chemical_data.get('un_number')}, 错误: {e}")
+                stats['skipped'] += 1
+        if not rows:
+            return stats
+
+        try:
+            with self.engine.begin() as connection:
+                # 读取导入开始前已存在的同UN编号记录
+                existing = {}
+                un_numbers = sorted({row['un_number'] for row in rows})
+                for start in range(0, len(un_numbers), self.IN_QUERY_BATCH_SIZE):
+                    query = select(*columns.values()).where(
+                        columns['un_number'].in_(un_numbers[start:start + self.IN_QUERY_BATCH_SIZE]),
+                        columns['id'] <= state['max_id']
+                    ).order_by(columns['id'])
+                    for record in connection.execute(query):
+                        record = dict(zip(columns, record))
+                        if record['id'] not in state['matched_ids']:
+                            existing.setdefault(tuple(record[key] for key in UPSERT_KEY), []).append(record)
+
+                inserts, updates = [], []
+                for row in rows:
+                    candidates = existing.get(tuple(row[key] for key in UPSERT_KEY))
+                    if not candidates:
+                        inserts.append({CHEMICAL_COLUMNS[key]: value for key, value in row.items()})
+                        continue
+
+                    record = candidates.pop(0)
+                    state['matched_ids'].add(record['id'])
+                    if not update_existing or all(record[key] == value for key, value in row.items()):
+                        stats['unchanged'] += 1
+                    else:
+                        updates.append({'b_id': record['id'], **{f'b_{key}': value for key, value in row.items()}})
+
+                if updates:
+                    statement = update(table).where(columns['id'] == bindparam('b_id')).values(
+                        {columns[key]: bindparam(f'b_{key}') for key in DATA_FIELDS})
+                    connection.execute(statement, updates)
+                if inserts:
+                    connection.execute(insert(table), inserts)
+
+            stats['inserted'] = len(inserts)
+            stats['updated'] = len(updates)
+            if inserts or updates:
+                self.invalidate_catalog_indexes()
+            return stats
+
+        except Exception as e:
+            logger.error(f"批量导入失败: {e}")
+            stats['skipped'] += len(rows)
+            return stats
+
     def query_by_un_number(self, un_number: int) -> List[Dict[str, Any]]:
         """根据UN编号查询化学品（返回所有匹配的记录）"""
         session = self.Session()
@@ -152,12 +265,54 @@ class MySQLHandler:
         finally:
             session.close()
     
+    def query_by_un_numbers(self, un_numbers: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        批量根据UN编号查询化学品（一个会话内按批执行 IN 查询）
+
+        Args:
+            un_numbers: UN编号列表
+
+        Returns:
+            UN编号 -> 匹配的记录列表（按输入顺序，未找到的编号对应空列表）
+        """
+        un_numbers = list(dict.fromkeys(int(un_number) for un_number in un_numbers))
+        results = {un_number: [] for un_number in un_numbers}
+        if not un_numbers:
+            return results
+
+        session = self.Session()
+        try:
+            for start in range(0, len(un_numbers), self.IN_QUERY_BATCH_SIZE):
+                chemicals = session.query(HazardousChemicalsCatalog).filter(
+                    HazardousChemicalsCatalog.un_number.in_(un_numbers[start:start + self.IN_QUERY_BATCH_SIZE])
+                ).order_by(HazardousChemicalsCatalog.id).all()
+
+                for chemical in chemicals:
+                    results[chemical.un_number].append(self._chemical_to_dict(chemical))
+            return results
+
+        except Exception as e:
+            logger.error(f"批量查询UN编号失败: {e}")
+            return {un_number: [] for un_number in un_numbers}
+        finally:
+            session.close()
+
     def search_by_name(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
-        """根据名称搜索化学品"""
+        """
+        根据名称子串搜索化学品（匹配中文或英文名称，名称越接近查询词越靠前）
+
+        使用内存中的n-gram倒排索引，与名录副本的结果一致；索引不可用时退回数据库的子串查询
+        """
+        try:
+            chemicals, name_index = self.get_name_index()
+            return [dict(chemicals[position]) for position in name_index.search(name, limit)]
+        except Exception as e:
+            logger.warning(f"名称索引不可用，改为数据库查询: {e}")
+
         session = self.Session()
         try:
             chemicals = session.query(HazardousChemicalsCatalog).filter(
-                HazardousChemicalsCatalog.chinese_name.like(f'%{name}%')
+                self.backend.name_filter(HazardousChemicalsCatalog, name)
             ).limit(limit).all()
 
             return [self._chemical_to_dict(chemical) for chemical in chemicals]
@@ -168,6 +323,62 @@ class MySQLHandler:
         finally:
             session.close()
     
+    def query_by_codes(self, field: str, codes: Iterable[Union[int, str]]) -> List[Dict[str, Any]]:
+        """
+        按规定代码查询携带任一代码的化学品（使用内存倒排索引，不访问数据库）
+
+        Args:
+            field: 代码列，如 special_provisions、packaging_instruction、portable_tank_instruction
+            codes: 代码列表，如 [188]、['P903']、['P112']（包含P112(a)等分项）
+
+        Returns:
+            匹配的化学品记录列表
+        """
+        try:
+            return self.get_code_index().lookup(field, codes)
+        except Exception as e:
+            logger.error(f"按规定代码查询失败: {e}")
+            return []
+
+    def get_code_index(self) -> CodeIndex:
+        """获取规定代码倒排索引（从数据库加载全部记录并解析，按名录数据版本缓存）"""
+        return self._get_catalog_index('code_index', CodeIndex)
+
+    def get_name_index(self) -> Tuple[List[Dict[str, Any]], NgramIndex]:
+        """获取名称n-gram倒排索引：(全部记录, 中英文名称索引)，按名录数据版本缓存"""
+        return self._get_catalog_index('name_index', lambda chemicals: (chemicals, NgramIndex(
+            [(chemical.get('chinese_name'), chemical.get('english_name')) for chemical in chemicals])))
+
+    def _get_catalog_index(self, kind: str, build: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        """
+        获取由全部名录记录构建的内存索引
+
+        索引按名录数据版本（记录数 + 最大更新时间）缓存，每隔 CACHE_VERSION_CHECK_INTERVAL 秒检查一次版本，
+        版本变化时重建，因此导入脚本或其他进程写入的数据同样会生效
+        """
+        entry = self._catalog_indexes.get(kind)
+        if entry is not None and time.monotonic() - entry[2] < Settings.CACHE_VERSION_CHECK_INTERVAL:
+            return entry[0]
+
+        with self._catalog_index_lock:
+            entry = self._catalog_indexes.get(kind)
+            if entry is not None and time.monotonic() - entry[2] < Settings.CACHE_VERSION_CHECK_INTERVAL:
+                return entry[0]
+
+            version = self.get_catalog_version()
+            if entry is None or version is None or version != entry[1]:
+                chemicals = self.get_all_chemicals()
+                index = build(chemicals)
+                logger.info(f"名录索引 {kind} 构建完成，共 {len(chemicals)} 条记录")
+            else:
+                index = entry[0]
+            self._catalog_indexes[kind] = (index, version, time.monotonic())
+            return index
+
+    def invalidate_catalog_indexes(self):
+        """使内存中的规定代码索引和名称索引失效（本进程写入数据后调用，下次查询时重建）"""
+        self._catalog_indexes = {}
+
     def get_all_chemicals(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """获取所有化学品记录"""
         session = self.Session()
@@ -185,6 +396,54 @@ class MySQLHandler:
         finally:
             session.close()
     
+    def iter_chemicals(self, columns: Optional[Sequence[str]] = None,
+                       batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        流式遍历化学品记录（服务端游标分批读取，只查询需要的列，内存占用与表大小无关）
+
+        Args:
+            columns: 需要的字段（键与 _chemical_to_dict 一致），默认全部字段
+            batch_size: 每批从数据库读取的行数
+
+        Yields:
+            化学品记录字典（只包含所选字段）
+        """
+        columns = list(columns) if columns else list(CHEMICAL_COLUMNS)
+        table = HazardousChemicalsCatalog.__table__
+        query = select(*(table.c[CHEMICAL_COLUMNS[key]] for key in columns)).order_by(table.c.id)
+
+        session = self.Session()
+        try:
+            result = session.execute(query.execution_options(yield_per=batch_size))
+            for row in result:
+                chemical = dict(zip(columns, row))
+                for key in ('created_at', 'updated_at'):
+                    if chemical.get(key) is not None:
+                        chemical[key] = chemical[key].isoformat()
+                yield chemical
+
+        except Exception as e:
+            logger.error(f"流式读取化学品记录失败: {e}")
+            raise
+        finally:
+            session.close()
+
+    def get_catalog_version(self) -> Optional[Tuple[int, Optional[str]]]:
+        """获取名录数据版本：(记录数, 最大更新时间)，任一变化即表示数据已变更"""
+        session = self.Session()
+        try:
+            count, last_updated = session.query(
+                func.count(HazardousChemicalsCatalog.id),
+                func.max(HazardousChemicalsCatalog.updated_at)
+            ).one()
+            return count, str(last_updated) if last_updated else None
+
+        except Exception as e:
+            logger.error(f"获取名录数据版本失败: {e}")
+            return None
+        finally:
+            session.close()
+
     def get_statistics(self) -> Dict[str, Any]:
         """获取数据库统计信息"""
         session = self.Session()
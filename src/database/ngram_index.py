@@ -0,0 +1,82 @@
+"""
+N-gram倒排索引模块
+为化学品中英文名称建立字符一元/二元组倒排表，子串查询通过求postings交集得到候选，
+再校验子串并按覆盖度排序，避免 LIKE '%name%' 的全表扫描
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+class NgramIndex:
+    """字符n-gram倒排索引（只读）"""
+
+    def __init__(self, documents: Sequence[Sequence[str]]):
+        """
+        Args:
+            documents: 每条记录需要检索的文本字段，如 [(中文名称, 英文名称), ...]
+        """
+        self.texts: List[Tuple[str, ...]] = [tuple(self.normalize(text) for text in fields)
+                                             for fields in documents]
+
+        postings = {}
+        for position, fields in enumerate(self.texts):
+            grams = set()
+            for text in fields:
+                grams.update(text)
+                grams.update(text[i:i + 2] for i in range(len(text) - 1))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.asarray(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """统一大小写"""
+        return (text or '').casefold()
+
+    def candidates(self, query: str) -> np.ndarray:
+        """包含查询中所有n-gram的记录位置（升序）"""
+        query = self.normalize(query)
+        grams = {query} if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+
+        # 从最短的postings开始求交集
+        postings = sorted((self.postings.get(gram) for gram in grams),
+                          key=lambda items: 0 if items is None else len(items))
+        if not postings or postings[0] is None:
+            return np.empty(0, dtype=np.int32)
+
+        result = postings[0]
+        for items in postings[1:]:
+            result = np.intersect1d(result, items, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+    def search(self, query: str, limit: int = 50) -> List[int]:
+        """
+        子串搜索
+
+        Args:
+            query: 查询文本
+            limit: 返回数量上限
+
+        Returns:
+            匹配记录的位置，按覆盖度（查询长度 / 命中字段长度）降序，覆盖度相同时保持记录顺序
+        """
+        normalized = self.normalize(query)
+        if not normalized:
+            return list(range(min(limit, len(self.texts))))
+
+        matches = []
+        for position in self.candidates(normalized):
+            coverage = max((len(normalized) / len(text) for text in self.texts[position] if normalized in text),
+                           default=0.0)
+            if coverage > 0:
+                matches.append((-coverage, int(position)))
+
+        matches.sort()
+        return [position for _, position in matches[:limit]]
@@ -3,15 +3,45 @@
 结合结构化查询和语义搜索，提供多种检索策略
 """
 
-import re
-from typing import List, Dict, Any, Optional, Tuple
+import json
+import time
+import base64
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from loguru import logger
 
 from src.database.mysql_handler import MySQLHandler
+from src.database.catalog_replica import CatalogReplica
+from src.retrieval.query_analyzer import QueryAnalyzer
+from src.retrieval.regulation_links import (RegulationLinks, REGULATION_FILTER, TERM_TOP_K, CATEGORY_TOP_K,
+                                            regulation_search_terms, category_search_terms)
 from src.vector_db.chroma_handler import VectorHandler
+from src.utils.cache import LRUCache
+from src.utils.deadline import Deadline
+from src.utils.metrics import metrics
 from config.settings import Settings
 
 
+# 检索线程池（进程内所有检索器共享，按 MAX_WORKERS 设置大小）
+_EXECUTOR_THREAD_PREFIX = 'hybrid-retriever'
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """获取共享的检索线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=Settings.MAX_WORKERS,
+                                               thread_name_prefix=_EXECUTOR_THREAD_PREFIX)
+    return _executor
+
+
 class HybridRetriever:
     """混合检索器"""
 
@@ -19,8 +49,33 @@ class HybridRetriever:
         self.mysql_handler = MySQLHandler()
         self.vector_handler = VectorHandler()
         self.config = Settings.get_vector_db_config()
+        self.query_analyzer = QueryAnalyzer(Settings.QUERY_KEYWORDS_FILE)
+
+        # 可选的名录只读副本
+        self.catalog_replica = None
+        if Settings.CATALOG_REPLICA_ENABLED:
+            self.catalog_replica = CatalogReplica.from_handler(
+                self.mysql_handler, Settings.CATALOG_REPLICA_REFRESH_INTERVAL)
+
+        # 预计算的法规关联表（按向量索引版本懒加载）
+        self._regulation_links = None
+        self._regulation_links_version = None
+
+        # 检索结果缓存，名录或向量索引版本变化时清空
+        self.result_cache = LRUCache(Settings.RETRIEVAL_CACHE_SIZE, Settings.CACHE_TTL) if Settings.CACHE_ENABLED else None
+        self._cache_versions = None
+        self._catalog_version = None
+        self._catalog_version_checked_at = None
+
+    def _catalog(self):
+        """结构化查询的数据源：副本可用时使用副本，否则回退到MySQL"""
+        if self.catalog_replica is not None and self.catalog_replica.is_fresh():
+            return self.catalog_replica
+        return self.mysql_handler
         
-    def retrieve(self, query: str, strategy: str = "auto", top_k: int = 5, verbose: bool = False) -> Dict[str, Any]:
+    def retrieve(self, query: str, strategy: str = "auto", top_k: int = 5, verbose: bool = False,
+                 page_size: Optional[int] = None, cursor: Optional[str] = None,
+                 deadline_ms: Optional[float] = None) -> Dict[str, Any]:
         """
         主检索接口
 
@@ -29,11 +84,37 @@ class HybridRetriever:
             strategy: 检索策略 ("exact", "semantic", "hybrid", "auto")
             top_k: 返回结果数量
             verbose: 是否显示详细查询流程
+            page_size: 分页大小，设置后只返回第一页的化学品及其相关法规，并返回 next_cursor
+            cursor: 上一页返回的 next_cursor，传入时按游标中的检索参数返回下一页
+            deadline_ms: 时间预算（毫秒），设置后各阶段（精确搜索、语义搜索、法规关联、备用搜索）
+                         只在剩余时间内执行，超时的阶段被跳过或提前结束，
+                         结果中 partial 标记是否为部分结果，skipped_stages 列出未完整执行的阶段
 
         Returns:
             包含化学品数据和相关法规的结构化结果
+
+        Raises:
+            ValueError: cursor 无效、被篡改或与 query 不匹配
         """
+        with metrics.strategy(strategy), metrics.span('retrieve'):
+            return self._retrieve(query, strategy, top_k, verbose, page_size, cursor, deadline_ms)
+
+    def _retrieve(self, query: str, strategy: str, top_k: int, verbose: bool, page_size: Optional[int],
+                  cursor: Optional[str], deadline_ms: Optional[float]) -> Dict[str, Any]:
+        # 无效的游标直接抛出 ValueError，不与"没有更多结果"混淆
+        offset = 0
+        if cursor is not None:
+            strategy, top_k, page_size, offset = self._decode_cursor(cursor, query)
+        page = (page_size, offset) if page_size else None
+
         try:
+            deadline = Deadline.create(deadline_ms)
+
+            cache_key = self._result_cache_key(query, strategy, top_k, verbose, page)
+            cached_result = self._get_cached_result(cache_key, query)
+            if cached_result is not None:
+                return self._finish_result(None, cached_result, deadline)
+
             if verbose:
                 print(f"\n🔍 查询流程:")
                 print(f"1. 用户输入：如\"{query}\"的危险性及解释。")
@@ -42,60 +123,512 @@ class HybridRetriever:
 
             # 获取基础搜索结果
             if strategy == "exact":
-                basic_results = self._exact_search(query, top_k, verbose)
+                basic_results = self._run_stage(deadline, 'exact',
+                                                lambda: self._exact_search(query, top_k, verbose, deadline=deadline))
             elif strategy == "semantic":
-                basic_results = self._semantic_search(query, top_k, verbose)
+                basic_results = self._run_stage(deadline, 'semantic',
+                                                lambda: self._semantic_search(query, top_k, verbose, deadline=deadline))
             elif strategy == "hybrid":
-                basic_results = self._hybrid_search(query, top_k, verbose)
+                basic_results = self._hybrid_search(query, top_k, verbose, deadline)
             else:  # auto
-                basic_results = self._auto_search(query, top_k, verbose)
+                basic_results = self._auto_search(query, top_k, verbose, deadline)
+
+            # 分页：只为当前页的化学品生成内容和查找相关法规
+            if page is not None:
+                if not self._has_structured_results(basic_results) and self._check_deadline(deadline, 'fallback'):
+                    if verbose:
+                        print(f"6. 备用搜索：未找到直接结果，尝试提取化学品名称进行搜索")
+                    basic_results = self._fallback_results(query, top_k, verbose, deadline) or basic_results
+                return self._finish_result(cache_key, self._build_page(basic_results, query, strategy, top_k,
+                                                                       page_size, offset, deadline), deadline)
 
             # 构建结构化结果
-            structured_result = self._build_structured_result(basic_results, query, verbose)
+            structured_result = self._build_structured_result(basic_results, query, verbose, deadline)
 
             # 如果没有找到结果，尝试备用搜索
-            if not structured_result.get('chemical_data') and not structured_result.get('regulations'):
+            if not structured_result.get('chemical_data') and not structured_result.get('regulations') \
+                    and self._check_deadline(deadline, 'fallback'):
                 if verbose:
                     print(f"6. 备用搜索：未找到直接结果，尝试提取化学品名称进行搜索")
-                fallback_result = self._fallback_search(query, top_k, verbose)
+                fallback_result = self._fallback_search(query, top_k, verbose, deadline)
                 if fallback_result.get('chemical_data') or fallback_result.get('regulations'):
-                    return fallback_result
+                    return self._finish_result(cache_key, fallback_result, deadline)
 
-            return structured_result
+            return self._finish_result(cache_key, structured_result, deadline)
 
         except Exception as e:
             logger.error(f"检索失败: {e}")
             return {"chemical_data": [], "regulations": [], "query": query}
     
-    def _auto_search(self, query: str, top_k: int, verbose: bool = False) -> List[Dict[str, Any]]:
+    def retrieve_many(self, queries: List[str], strategy: str = "auto", top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        批量检索接口（结果与逐条调用 retrieve 一致）
+
+        重复的查询只检索一次；所有查询先分类，UN编号一次批量查询，语义检索按检索数量分组一次向量化，
+        所有查询的化学品一起查找相关法规
+
+        Args:
+            queries: 查询文本列表
+            strategy: 检索策略 ("exact", "semantic", "hybrid", "auto")
+            top_k: 每个查询返回结果数量
+
+        Returns:
+            与queries一一对应的结构化结果
+        """
+        with metrics.strategy(strategy), metrics.span('retrieve_many'):
+            return self._retrieve_many(queries, strategy, top_k)
+
+    def _retrieve_many(self, queries: List[str], strategy: str, top_k: int) -> List[Dict[str, Any]]:
+        try:
+            unique_queries = list(dict.fromkeys(queries))
+            results = {}
+            cache_keys = {}
+            for query in unique_queries:
+                cache_keys[query] = self._result_cache_key(query, strategy, top_k, False)
+                cached_result = self._get_cached_result(cache_keys[query], query)
+                if cached_result is not None:
+                    results[query] = cached_result
+
+            pending = [query for query in unique_queries if query not in results]
+            if pending:
+                logger.info(f"开始批量检索，{len(pending)} 个查询（共 {len(queries)} 个），策略: {strategy}")
+
+                basic_results_list = self._batch_search(pending, strategy, top_k)
+                structured_results = self._build_structured_results(basic_results_list, pending)
+
+                for query, structured_result in zip(pending, structured_results):
+                    # 如果没有找到结果，尝试备用搜索
+                    if not structured_result.get('chemical_data') and not structured_result.get('regulations'):
+                        fallback_result = self._fallback_search(query, top_k)
+                        if fallback_result.get('chemical_data') or fallback_result.get('regulations'):
+                            structured_result = fallback_result
+                    results[query] = self._cache_result(cache_keys[query], structured_result)
+
+            # 重复的查询各自返回一份副本
+            returned = set()
+            batch_results = []
+            for query in queries:
+                batch_results.append(self._copy_result(results[query], query) if query in returned else results[query])
+                returned.add(query)
+            return batch_results
+
+        except Exception as e:
+            logger.error(f"批量检索失败，改为逐条检索: {e}")
+            return [self.retrieve(query, strategy, top_k) for query in queries]
+
+    def _batch_search(self, queries: List[str], strategy: str, top_k: int) -> List[List[Dict[str, Any]]]:
+        """批量获取基础搜索结果（各查询的检索方式与 retrieve 相同）"""
+        # 按策略确定每个查询的检索方式：(精确搜索数量, 语义搜索数量)，0表示不执行
+        hybrid_k = top_k // 2 + 1
+        plans = []
+        for query in queries:
+            mode = strategy
+            parsed_query = None
+            if strategy not in ("exact", "semantic", "hybrid"):  # auto
+                with metrics.span('query_detection'):
+                    parsed_query = self.query_analyzer.analyze(query)
+                mode = {"un_number": "exact", "code_search": "hybrid",
+                        "name_search": "hybrid"}.get(parsed_query.query_type, "auto")
+            exact_k, semantic_k = {"exact": (top_k, 0), "semantic": (0, top_k),
+                                   "hybrid": (hybrid_k, hybrid_k)}.get(mode, (top_k, top_k))
+            if mode == "auto" and not parsed_query.names:
+                # 自然语言查询没有名称线索时，精确搜索留到语义结果不足时再执行
+                exact_k = 0
+            plans.append((mode, exact_k, semantic_k))
+
+        # 所有UN编号一次批量查询
+        un_numbers = list(dict.fromkeys(un_num for query, (_, exact_k, _) in zip(queries, plans) if exact_k
+                                        for un_num in self.query_analyzer.analyze(query).un_numbers))
+        chemicals_by_un = {}
+        if un_numbers:
+            with metrics.span('mysql.query_by_un_numbers'):
+                chemicals_by_un = self._catalog().query_by_un_numbers(un_numbers)
+
+        # 语义检索按检索数量分组，每组一次向量化和索引检索
+        semantic_groups = {}
+        for query, (_, _, semantic_k) in zip(queries, plans):
+            if semantic_k:
+                semantic_groups.setdefault(semantic_k, []).append(query)
+        vector_results = {}
+        for semantic_k, group in semantic_groups.items():
+            group = list(dict.fromkeys(group))
+            for query, results in zip(group, self.vector_handler.semantic_search_batch(group, semantic_k)):
+                vector_results[(query, semantic_k)] = results
+
+        basic_results_list = []
+        for query, (mode, exact_k, semantic_k) in zip(queries, plans):
+            exact_results = self._exact_search(query, exact_k, False, chemicals_by_un) if exact_k else []
+            semantic_results = self._semantic_search(query, semantic_k, False,
+                                                     vector_results.get((query, semantic_k), [])) if semantic_k else []
+
+            if mode == "exact":
+                basic_results = exact_results
+            elif mode == "semantic":
+                basic_results = semantic_results
+            elif mode == "hybrid":
+                basic_results = self._merge_results(exact_results, semantic_results)[:top_k]
+            elif len(semantic_results) < top_k:
+                # 自然语言查询：语义搜索结果不足时补充精确搜索
+                if not exact_k:
+                    exact_results = self._exact_search(query, top_k, False, chemicals_by_un)
+                basic_results = self._merge_results(semantic_results,
+                                                    exact_results[:top_k - len(semantic_results)])[:top_k]
+            else:
+                basic_results = semantic_results
+            basic_results_list.append(basic_results)
+        return basic_results_list
+
+    def _result_cache_key(self, query: str, strategy: str, top_k: int, verbose: bool,
+                          page: Optional[Tuple[int, int]] = None) -> Optional[Tuple]:
+        """检索结果缓存键；缓存未启用、需要显示查询流程或数据版本未知时返回None"""
+        if self.result_cache is None or verbose:
+            return None
+
+        versions = (self._get_catalog_version(), self.vector_handler.index_version)
+        if versions[0] is None:
+            return None
+        if versions != self._cache_versions:
+            # 名录或向量索引已变化，旧结果全部失效
+            self.result_cache.clear()
+            self._cache_versions = versions
+
+        return ' '.join(query.split()), strategy, top_k, page, versions
+
+    def _get_catalog_version(self):
+        """名录数据版本：副本可用时取副本快照的版本，否则按间隔轮询数据库"""
+        if self.catalog_replica is not None and self.catalog_replica.is_fresh():
+            return self.catalog_replica.version
+
+        now = time.monotonic()
+        if (self._catalog_version_checked_at is None
+                or now - self._catalog_version_checked_at >= Settings.CACHE_VERSION_CHECK_INTERVAL):
+            self._catalog_version = self.mysql_handler.get_catalog_version()
+            self._catalog_version_checked_at = now
+        return self._catalog_version
+
+    def _get_cached_result(self, cache_key: Optional[Tuple], query: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的检索结果（返回副本）"""
+        if cache_key is None:
+            return None
+        cached_result = self.result_cache.get(cache_key)
+        if cached_result is None:
+            return None
+        logger.debug(f"检索结果缓存命中: '{query}'")
+        return self._copy_result(cached_result, query)
+
+    def _cache_result(self, cache_key: Optional[Tuple], result: Dict[str, Any]) -> Dict[str, Any]:
+        """写入检索结果缓存（保存副本），返回原结果"""
+        if cache_key is not None:
+            self.result_cache.put(cache_key, self._copy_result(result, result.get('query')))
+        return result
+
+    def _finish_result(self, cache_key: Optional[Tuple], result: Dict[str, Any],
+                       deadline: Optional[Deadline]) -> Dict[str, Any]:
+        """写入缓存并返回结果；设置了时间预算时标记是否为部分结果（部分结果不写入缓存）"""
+        if deadline is None:
+            return self._cache_result(cache_key, result)
+
+        if not deadline.partial:
+            self._cache_result(cache_key, result)
+        result['partial'] = deadline.partial
+        result['skipped_stages'] = list(deadline.skipped_stages)
+        if deadline.partial:
+            logger.warning(f"检索超出时间预算 {deadline.budget_ms}ms，返回部分结果，"
+                           f"未完成的阶段: {deadline.skipped_stages}")
+        return result
+
+    @staticmethod
+    def _copy_result(result: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """复制结构化结果，避免调用方修改缓存内容"""
+        copied = dict(result, query=query)
+        for key in ('chemical_data', 'regulations'):
+            if key in copied:
+                copied[key] = [dict(item, metadata=dict(item.get('metadata', {}))) for item in copied[key]]
+        for item in copied.get('chemical_data', []):
+            if item.get('chemical_data') is not None:
+                item['chemical_data'] = dict(item['chemical_data'])
+        return copied
+
+    def _run_parallel(self, *calls: Callable[[], Any], deadline: Optional[Deadline] = None,
+                      stages: Tuple[str, ...] = (), default: Callable[[], Any] = list) -> List[Any]:
+        """
+        并行执行多路检索，按顺序返回各自的结果
+
+        除最后一路外都提交到共享线程池（带上当前上下文，各阶段耗时按调用方的检索策略记录），最后一路在当前线程执行；
+        线程池不可用或当前已在线程池中（避免嵌套提交耗尽线程）时顺序执行。
+        设置 deadline 时所有调用都提交到线程池，只在剩余时间内等待，
+        未按时完成的调用记为对应的阶段（stages）被跳过，结果取 default()
+        """
+        if Settings.MAX_WORKERS <= 1 or threading.current_thread().name.startswith(_EXECUTOR_THREAD_PREFIX):
+            # 无法限时等待，由各阶段在开始前检查剩余时间
+            return [call() for call in calls]
+
+        executor = _get_executor()
+        if deadline is None:
+            futures = [executor.submit(contextvars.copy_context().run, call) for call in calls[:-1]]
+            last_result = calls[-1]()
+            return [future.result() for future in futures] + [last_result]
+
+        results = []
+        futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+        for future, stage in zip(futures, stages):
+            try:
+                results.append(future.result(timeout=deadline.remaining()))
+            except FutureTimeoutError:
+                # 超时的调用在线程池中继续执行完，结果被丢弃
+                deadline.skip(stage)
+                results.append(default())
+        return results
+
+    def _run_stage(self, deadline: Optional[Deadline], stage: str, call: Callable[[], Any],
+                   default: Callable[[], Any] = list) -> Any:
+        """在时间预算内执行一个阶段（未设置 deadline 时直接执行）"""
+        if deadline is None:
+            return call()
+        if not deadline.check(stage):
+            return default()
+        return self._run_parallel(call, deadline=deadline, stages=(stage,), default=default)[0]
+
+    async def _arun_stage(self, deadline: Optional[Deadline], stage: str, call: Callable[[], Any],
+                          default: Callable[[], Any] = list) -> Any:
+        """在时间预算内执行一个阶段（异步版本，在线程中执行；超时时结果取 default()，在当前线程执行）"""
+        if deadline is None:
+            return await asyncio.to_thread(call)
+        if not deadline.check(stage):
+            return default()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(call), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            deadline.skip(stage)
+            return default()
+
+    @staticmethod
+    async def _abuild_result(deadline: Optional[Deadline], build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """在线程中构建结构化结果；超时时不再等待，在当前线程重新构建（此时已超时，不再查找相关法规）"""
+        if deadline is None:
+            return await asyncio.to_thread(build)
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(build), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            return build()
+
+    @staticmethod
+    def _check_deadline(deadline: Optional[Deadline], stage: str) -> bool:
+        """阶段能否开始执行（未设置 deadline 时总是可以）"""
+        return deadline is None or deadline.check(stage)
+
+    async def aretrieve(self, query: str, strategy: str = "auto", top_k: int = 5, verbose: bool = False,
+                        page_size: Optional[int] = None, cursor: Optional[str] = None,
+                        deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        异步检索接口（参数和返回值与 retrieve 相同）
+
+        MySQL查询和向量检索在线程中执行，混合检索的两路查询并发进行，
+        调用方可以在一个事件循环中同时处理多个查询
+        """
+        with metrics.strategy(strategy), metrics.span('retrieve'):
+            return await self._aretrieve(query, strategy, top_k, verbose, page_size, cursor, deadline_ms)
+
+    async def _aretrieve(self, query: str, strategy: str, top_k: int, verbose: bool, page_size: Optional[int],
+                         cursor: Optional[str], deadline_ms: Optional[float]) -> Dict[str, Any]:
+        # 无效的游标直接抛出 ValueError，不与"没有更多结果"混淆
+        offset = 0
+        if cursor is not None:
+            strategy, top_k, page_size, offset = self._decode_cursor(cursor, query)
+        page = (page_size, offset) if page_size else None
+
+        try:
+            deadline = Deadline.create(deadline_ms)
+
+            try:
+                cache_key = await asyncio.wait_for(
+                    asyncio.to_thread(self._result_cache_key, query, strategy, top_k, verbose, page),
+                    timeout=deadline.remaining() if deadline else None)
+            except asyncio.TimeoutError:
+                cache_key = None  # 超出时间预算时不使用缓存
+            cached_result = self._get_cached_result(cache_key, query)
+            if cached_result is not None:
+                return self._finish_result(None, cached_result, deadline)
+
+            if verbose:
+                print(f"\n🔍 查询流程:")
+                print(f"1. 用户输入：如\"{query}\"的危险性及解释。")
+
+            logger.info(f"开始异步检索，查询: '{query}'，策略: {strategy}")
+
+            # 获取基础搜索结果
+            if strategy == "exact":
+                basic_results = await self._arun_stage(deadline, 'exact',
+                                                       lambda: self._exact_search(query, top_k, verbose, deadline=deadline))
+            elif strategy == "semantic":
+                basic_results = await self._arun_stage(deadline, 'semantic',
+                                                       lambda: self._semantic_search(query, top_k, verbose, deadline=deadline))
+            elif strategy == "hybrid":
+                basic_results = await self._ahybrid_search(query, top_k, verbose, deadline)
+            else:  # auto
+                basic_results = await self._aauto_search(query, top_k, verbose, deadline)
+
+            # 分页：只为当前页的化学品生成内容和查找相关法规
+            if page is not None:
+                if not self._has_structured_results(basic_results) and self._check_deadline(deadline, 'fallback'):
+                    if verbose:
+                        print(f"6. 备用搜索：未找到直接结果，尝试提取化学品名称进行搜索")
+                    basic_results = await self._arun_stage(
+                        deadline, 'fallback', lambda: self._fallback_results(query, top_k, verbose, deadline)
+                    ) or basic_results
+                build_page = lambda: self._build_page(basic_results, query, strategy, top_k, page_size, offset, deadline)
+                page_result = await self._abuild_result(deadline, build_page)
+                return self._finish_result(cache_key, page_result, deadline)
+
+            # 构建结构化结果（法规关联检索）
+            # （超时时不再等待，直接构建不含相关法规的结果）
+            build_result = lambda: self._build_structured_result(basic_results, query, verbose, deadline)
+            structured_result = await self._abuild_result(deadline, build_result)
+
+            # 如果没有找到结果，尝试备用搜索
+            if not structured_result.get('chemical_data') and not structured_result.get('regulations') \
+                    and self._check_deadline(deadline, 'fallback'):
+                if verbose:
+                    print(f"6. 备用搜索：未找到直接结果，尝试提取化学品名称进行搜索")
+                fallback_result = await self._arun_stage(
+                    deadline, 'fallback', lambda: self._fallback_search(query, top_k, verbose, deadline),
+                    default=lambda: {"chemical_data": [], "regulations": [], "query": query})
+                if fallback_result.get('chemical_data') or fallback_result.get('regulations'):
+                    return self._finish_result(cache_key, fallback_result, deadline)
+
+            return self._finish_result(cache_key, structured_result, deadline)
+
+        except Exception as e:
+            logger.error(f"异步检索失败: {e}")
+            return {"chemical_data": [], "regulations": [], "query": query}
+
+    async def _aauto_search(self, query: str, top_k: int, verbose: bool = False,
+                            deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """自动选择检索策略（异步版本）"""
+        try:
+            with metrics.span('query_detection'):
+                parsed_query = self.query_analyzer.analyze(query)
+            query_type = parsed_query.query_type
+
+            if query_type == "un_number":
+                if verbose:
+                    print(f"2. 查询类型检测：识别为UN编号查询")
+                return await self._arun_stage(deadline, 'exact',
+                                              lambda: self._exact_search(query, top_k, verbose, deadline=deadline))
+            elif query_type in ("code_search", "name_search"):
+                if verbose:
+                    print(f"2. 查询类型检测：识别为{'规定代码' if query_type == 'code_search' else '化学品名称'}查询")
+                return await self._ahybrid_search(query, top_k, verbose, deadline)
+            else:
+                if verbose:
+                    print(f"2. 查询类型检测：识别为自然语言查询")
+                if parsed_query.names:
+                    # 查询中提取到化学品名称时，补充用的精确搜索与语义搜索并发执行，语义结果足够时丢弃
+                    # （精确搜索结果是按top_k截取的前缀，取前 top_k - n 条与单独查询一致）
+                    semantic_results, exact_results = await asyncio.gather(
+                        self._arun_stage(deadline, 'semantic',
+                                         lambda: self._semantic_search(query, top_k, verbose, deadline=deadline)),
+                        self._arun_stage(deadline, 'exact',
+                                         lambda: self._exact_search(query, top_k, False, deadline=deadline))
+                    )
+                else:
+                    # 没有名称线索时只在语义结果不足时才执行精确搜索
+                    exact_results = None
+                    semantic_results = await self._arun_stage(
+                        deadline, 'semantic', lambda: self._semantic_search(query, top_k, verbose, deadline=deadline))
+
+                if len(semantic_results) < top_k:
+                    if verbose:
+                        print(f"5. 结果补充：语义搜索结果不足，补充精确搜索")
+                    if exact_results is None:
+                        exact_results = await self._arun_stage(
+                            deadline, 'exact', lambda: self._exact_search(query, top_k, False, deadline=deadline))
+                    combined_results = self._merge_results(semantic_results,
+                                                           exact_results[:top_k - len(semantic_results)])
+                    return combined_results[:top_k]
+
+                return semantic_results
+
+        except Exception as e:
+            logger.error(f"异步自动搜索失败: {e}")
+            return []
+
+    async def _ahybrid_search(self, query: str, top_k: int, verbose: bool = False,
+                              deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """混合搜索（异步版本，精确搜索和语义搜索并发执行）"""
+        try:
+            if verbose:
+                print(f"3. 混合搜索策略：同时执行MySQL精确查询和向量语义搜索")
+
+            exact_results, semantic_results = await asyncio.gather(
+                self._arun_stage(deadline, 'exact',
+                                 lambda: self._exact_search(query, top_k // 2 + 1, False, deadline=deadline)),
+                self._arun_stage(deadline, 'semantic',
+                                 lambda: self._semantic_search(query, top_k // 2 + 1, False, deadline=deadline))
+            )
+
+            # 合并和排序结果
+            combined_results = self._merge_results(exact_results, semantic_results)
+
+            if verbose and combined_results:
+                print(f"4. 结果整合：合并MySQL结果和向量搜索结果，格式化为LLM输入（如JSON）。")
+                print(f"5. LLM处理：通过RAG框架（如LangChain）生成最终响应。")
+
+            logger.info(f"混合搜索完成，返回 {len(combined_results[:top_k])} 个结果")
+            return combined_results[:top_k]
+
+        except Exception as e:
+            logger.error(f"异步混合搜索失败: {e}")
+            return []
+
+    def _auto_search(self, query: str, top_k: int, verbose: bool = False,
+                     deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
         """自动选择检索策略"""
         try:
             # 检测查询类型
-            query_type = self._detect_query_type(query)
+            with metrics.span('query_detection'):
+                parsed_query = self.query_analyzer.analyze(query)
+            query_type = parsed_query.query_type
 
             if query_type == "un_number":
                 # UN编号查询，使用精确搜索
                 if verbose:
                     print(f"2. 查询类型检测：识别为UN编号查询")
-                return self._exact_search(query, top_k, verbose)
-            elif query_type == "name_search":
-                # 名称搜索，使用混合搜索
+                return self._run_stage(deadline, 'exact',
+                                       lambda: self._exact_search(query, top_k, verbose, deadline=deadline))
+            elif query_type in ("code_search", "name_search"):
+                # 规定代码或名称搜索，使用混合搜索（精确搜索找出携带代码的化学品，语义搜索找出规定原文）
                 if verbose:
-                    print(f"2. 查询类型检测：识别为化学品名称查询")
-                return self._hybrid_search(query, top_k, verbose)
+                    print(f"2. 查询类型检测：识别为{'规定代码' if query_type == 'code_search' else '化学品名称'}查询")
+                return self._hybrid_search(query, top_k, verbose, deadline)
             else:
                 # 自然语言查询，优先使用语义搜索
                 if verbose:
                     print(f"2. 查询类型检测：识别为自然语言查询")
-                semantic_results = self._semantic_search(query, top_k, verbose)
+                if parsed_query.names:
+                    # 查询中提取到化学品名称时，补充用的精确搜索较可能命中，与语义搜索并行执行，语义结果足够时丢弃
+                    # （精确搜索结果是按top_k截取的前缀，取前 top_k - n 条与单独查询一致）
+                    exact_results, semantic_results = self._run_parallel(
+                        lambda: self._exact_search(query, top_k, False, deadline=deadline),
+                        lambda: self._semantic_search(query, top_k, verbose, deadline=deadline),
+                        deadline=deadline, stages=('exact', 'semantic')
+                    )
+                else:
+                    # 没有名称线索时只在语义结果不足时才执行精确搜索（避免名称扫描和同义词扩展扫描）
+                    exact_results = None
+                    semantic_results = self._run_stage(
+                        deadline, 'semantic', lambda: self._semantic_search(query, top_k, verbose, deadline=deadline))
 
                 # 如果语义搜索结果不够，补充精确搜索
                 if len(semantic_results) < top_k:
                     if verbose:
                         print(f"5. 结果补充：语义搜索结果不足，补充精确搜索")
-                    exact_results = self._exact_search(query, top_k - len(semantic_results), False)
+                    if exact_results is None:
+                        exact_results = self._run_stage(
+                            deadline, 'exact', lambda: self._exact_search(query, top_k, False, deadline=deadline))
                     # 合并结果，去重
-                    combined_results = self._merge_results(semantic_results, exact_results)
+                    combined_results = self._merge_results(semantic_results,
+                                                           exact_results[:top_k - len(semantic_results)])
                     return combined_results[:top_k]
 
                 return semantic_results
@@ -104,68 +637,45 @@ class HybridRetriever:
             logger.error(f"自动搜索失败: {e}")
             return []
     
-    def _detect_query_type(self, query: str) -> str:
-        """检测查询类型"""
-        # UN编号模式
-        if re.search(r'\bUN\s*\d+\b|\b\d{4}\b', query, re.IGNORECASE):
-            return "un_number"
-        
-        # 化学品名称搜索模式
-        chemical_keywords = ['化学品', '物质', '液体', '固体', '气体', '电池', '酸', '碱', '醇', '醚']
-        if any(keyword in query for keyword in chemical_keywords):
-            return "name_search"
-        
-        # 默认为自然语言查询
-        return "natural_language"
-
-    def _expand_search_terms(self, query: str) -> List[str]:
-        """扩展搜索词，处理同义词和相关词汇"""
-        expanded_terms = []
-
-        # 电池相关的扩展
-        if "锂电池" in query:
-            expanded_terms.extend(["锂离子电池", "锂金属电池", "锂合金电池"])
-        elif "电池" in query and "锂" in query:
-            expanded_terms.extend(["锂离子电池", "锂金属电池"])
-        elif "电池" in query:
-            expanded_terms.extend(["锂离子电池", "锂金属电池", "电池"])
-
-        # 化学品类别相关的扩展
-        if "易燃" in query:
-            expanded_terms.extend(["易燃液体", "易燃固体", "易燃气体"])
-        elif "腐蚀" in query:
-            expanded_terms.extend(["腐蚀性物质", "腐蚀性液体"])
-        elif "有毒" in query:
-            expanded_terms.extend(["有毒物质", "毒性物质"])
-
-        # 去重并返回
-        return list(set(expanded_terms))
-    
-    def _exact_search(self, query: str, top_k: int, verbose: bool = False) -> List[Dict[str, Any]]:
-        """精确搜索（基于MySQL）"""
+    @metrics.timed('exact_search')
+    def _exact_search(self, query: str, top_k: int, verbose: bool = False,
+                      prefetched: Optional[Dict[int, List[Dict[str, Any]]]] = None,
+                      deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """
+        精确搜索（基于MySQL）
+
+        prefetched 为批量检索预先查询的 UN编号 -> 记录列表，提供时不再查询数据库；
+        deadline 为时间预算，超时时不再执行扩展关键词搜索
+        """
         try:
+            if not self._check_deadline(deadline, 'exact'):
+                return []
+
             results = []
+            parsed_query = self.query_analyzer.analyze(query)
 
             # 提取UN编号
-            un_numbers = re.findall(r'\bUN\s*(\d+)\b|\b(\d{4})\b', query, re.IGNORECASE)
+            un_numbers = list(parsed_query.un_numbers)
 
             if un_numbers:
-                total_found = 0
-                for match in un_numbers:
-                    un_num = int(match[0] or match[1])
-                    chemicals = self.mysql_handler.query_by_un_number(un_num)
-                    total_found += len(chemicals)
+                if prefetched is None:
+                    # 所有编号一次批量查询
+                    with metrics.span('mysql.query_by_un_numbers'):
+                        chemicals_by_un = self._catalog().query_by_un_numbers(un_numbers)
+                else:
+                    # 复制预取的记录，避免不同查询的结果共享同一对象
+                    chemicals_by_un = {un_num: [dict(chemical) for chemical in prefetched.get(un_num, [])]
+                                       for un_num in dict.fromkeys(un_numbers)}
+                total_found = sum(len(chemicals_by_un.get(un_num, [])) for un_num in un_numbers)
 
                 if verbose:
-                    un_num = int(un_numbers[0][0] or un_numbers[0][1])
-                    print(f"3. MySQL查询：执行 SELECT * FROM hazardous_chemicals_catalog WHERE un_number = {un_num}，返回 {total_found} 条结构化数据。")
+                    numbers = ', '.join(str(un_num) for un_num in chemicals_by_un)
+                    print(f"3. MySQL查询：执行 SELECT * FROM hazardous_chemicals_catalog WHERE un_number IN ({numbers})，返回 {total_found} 条结构化数据。")
 
-                for match in un_numbers:
-                    un_num = int(match[0] or match[1])
-                    chemicals = self.mysql_handler.query_by_un_number(un_num)
-                    for chemical in chemicals:
+                for un_num in un_numbers:
+                    for chemical in chemicals_by_un.get(un_num, []):
                         results.append({
-                            'content': self._format_chemical_content(chemical),
+                            'content': None,  # 构建结构化结果时生成（分页时只生成当前页）
                             'metadata': {
                                 'source': 'mysql',
                                 'doc_type': 'chemical',
@@ -176,25 +686,58 @@ class HybridRetriever:
                             'chemical_data': chemical
                         })
 
-            # 如果没有找到UN编号，尝试名称搜索
+            # 按查询中的规定代码（特殊规定、包装指南等）查找携带该代码的化学品
+            if not results and parsed_query.codes:
+                codes_by_field = {}
+                for field, code in parsed_query.codes:
+                    codes_by_field.setdefault(field, []).append(code)
+
+                catalog = self._catalog()
+                for field, codes in codes_by_field.items():
+                    with metrics.span('mysql.query_by_codes'):
+                        chemicals = catalog.query_by_codes(field, codes)
+                    if verbose:
+                        print(f"3. 规定代码查询：{field} 包含 {codes} 的化学品，返回 {len(chemicals)} 条结构化数据。")
+                    for chemical in chemicals:
+                        results.append({
+                            'content': None,
+                            'metadata': {
+                                'source': 'mysql',
+                                'doc_type': 'chemical',
+                                'un_number': str(chemical['un_number']),
+                                'search_type': 'exact_code'
+                            },
+                            'score': 0.95,
+                            'chemical_data': chemical
+                        })
+                        if len(results) >= top_k:
+                            break
+                    if len(results) >= top_k:
+                        break
+
+            # 如果没有找到UN编号或规定代码，尝试名称搜索
             if not results:
                 if verbose:
                     print(f"3. MySQL查询：执行 SELECT * FROM hazardous_chemicals_catalog WHERE chinese_name LIKE '%{query}%'，返回结构化数据。")
 
                 # 首先尝试直接搜索
-                chemicals = self.mysql_handler.search_by_name(query, limit=top_k)
+                catalog = self._catalog()
+                with metrics.span('mysql.search_by_name'):
+                    chemicals = catalog.search_by_name(query, limit=top_k)
 
                 # 如果没有结果，尝试扩展关键词搜索
                 if not chemicals:
-                    expanded_queries = self._expand_search_terms(query)
-                    for expanded_query in expanded_queries:
-                        chemicals.extend(self.mysql_handler.search_by_name(expanded_query, limit=top_k))
+                    for expanded_query in parsed_query.expansions:
+                        if not self._check_deadline(deadline, 'exact'):
+                            break
+                        with metrics.span('mysql.search_by_name'):
+                            chemicals.extend(catalog.search_by_name(expanded_query, limit=top_k))
                         if len(chemicals) >= top_k:
                             break
 
                 for chemical in chemicals[:top_k]:
                     results.append({
-                        'content': self._format_chemical_content(chemical),
+                        'content': None,
                         'metadata': {
                             'source': 'mysql',
                             'doc_type': 'chemical',
@@ -212,13 +755,25 @@ class HybridRetriever:
             logger.error(f"精确搜索失败: {e}")
             return []
     
-    def _semantic_search(self, query: str, top_k: int, verbose: bool = False) -> List[Dict[str, Any]]:
-        """语义搜索（基于向量数据库）"""
+    @metrics.timed('semantic_search')
+    def _semantic_search(self, query: str, top_k: int, verbose: bool = False,
+                         vector_results: Optional[List[Dict[str, Any]]] = None,
+                         deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """
+        语义搜索（基于向量数据库）
+
+        vector_results 为批量检索预先得到的向量检索结果，提供时不再检索；
+        deadline 为时间预算，已超时时直接返回空结果
+        """
         try:
+            if not self._check_deadline(deadline, 'semantic'):
+                return []
+
             if verbose:
                 print(f"3. 向量数据库查询：将输入文本嵌入向量，执行k-NN搜索（k=3-5），返回语义相关性最高的前A段落。")
 
-            vector_results = self.vector_handler.semantic_search(query, top_k)
+            if vector_results is None:
+                vector_results = self.vector_handler.semantic_search(query, top_k)
 
             results = []
             for result in vector_results:
@@ -246,15 +801,19 @@ class HybridRetriever:
             logger.error(f"语义搜索失败: {e}")
             return []
     
-    def _hybrid_search(self, query: str, top_k: int, verbose: bool = False) -> List[Dict[str, Any]]:
+    def _hybrid_search(self, query: str, top_k: int, verbose: bool = False,
+                       deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
         """混合搜索（结合精确搜索和语义搜索）"""
         try:
             if verbose:
                 print(f"3. 混合搜索策略：同时执行MySQL精确查询和向量语义搜索")
 
-            # 分别进行精确搜索和语义搜索
-            exact_results = self._exact_search(query, top_k // 2 + 1, False)
-            semantic_results = self._semantic_search(query, top_k // 2 + 1, False)
+            # 精确搜索和语义搜索并行执行
+            exact_results, semantic_results = self._run_parallel(
+                lambda: self._exact_search(query, top_k // 2 + 1, False, deadline=deadline),
+                lambda: self._semantic_search(query, top_k // 2 + 1, False, deadline=deadline),
+                deadline=deadline, stages=('exact', 'semantic')
+            )
 
             # 合并和排序结果
             combined_results = self._merge_results(exact_results, semantic_results)
@@ -270,6 +829,7 @@ class HybridRetriever:
             logger.error(f"混合搜索失败: {e}")
             return []
     
+    @metrics.timed('merge')
     def _merge_results(self, results1: List[Dict], results2: List[Dict]) -> List[Dict]:
         """合并搜索结果，去重并按分数排序"""
         try:
@@ -335,139 +895,280 @@ class HybridRetriever:
     def get_retrieval_stats(self) -> Dict[str, Any]:
         """获取检索系统统计信息"""
         try:
-            mysql_stats = self.mysql_handler.get_statistics()
+            mysql_stats = self._catalog().get_statistics()
             vector_stats = self.vector_handler.get_collection_stats()
             
-            return {
+            stats = {
                 'mysql_stats': mysql_stats,
                 'vector_stats': vector_stats,
                 'config': self.config
             }
+            if self.catalog_replica is not None:
+                stats['catalog_replica'] = self.catalog_replica.stats()
+            if self.result_cache is not None:
+                stats['result_cache'] = self.result_cache.stats()
+            links = self._get_regulation_links()
+            if links is not None:
+                stats['regulation_links'] = links.stats()
+            if metrics.enabled:
+                stats['metrics'] = metrics.snapshot()
+            return stats
 
         except Exception as e:
             logger.error(f"获取检索统计信息失败: {e}")
             return {}
 
-    def _build_structured_result(self, basic_results: List[Dict], query: str, verbose: bool = False) -> Dict[str, Any]:
+    def _build_structured_result(self, basic_results: List[Dict], query: str, verbose: bool = False,
+                                 deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """构建结构化的查询结果"""
-        try:
-            # 分离化学品数据和法规数据
-            chemical_data = []
-            regulations = []
+        # 如果有化学品数据，查找相关法规
+        if verbose and any(result.get('metadata', {}).get('doc_type') == 'chemical' for result in basic_results):
+            print(f"6. 法规关联：根据化学品信息查找相关的附录A规定")
 
-            for result in basic_results:
-                if result.get('metadata', {}).get('doc_type') == 'chemical':
-                    chemical_data.append(result)
-                elif result.get('metadata', {}).get('doc_type') == 'regulation':
-                    regulations.append(result)
+        return self._build_structured_results([basic_results], [query], deadline)[0]
 
-            # 如果有化学品数据，查找相关法规
-            if chemical_data and verbose:
-                print(f"6. 法规关联：根据化学品信息查找相关的附录A规定")
+    def _build_structured_results(self, basic_results_list: List[List[Dict]], queries: List[str],
+                                  deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """批量构建结构化的查询结果（所有查询的化学品一起查找相关法规，超时时不附加相关法规）"""
+        try:
+            # 分离化学品数据和法规数据
+            separated = [self._split_results(basic_results) for basic_results in basic_results_list]
+            for chemical_data, _ in separated:
+                self._fill_chemical_contents(chemical_data)
 
             # 为化学品查找相关法规
-            related_regulations = self._find_related_regulations(chemical_data, query)
-
-            # 合并法规（去重）
-            all_regulations = self._merge_regulations(regulations, related_regulations)
-
-            return {
-                'query': query,
-                'chemical_data': chemical_data,
-                'regulations': all_regulations,
-                'total_chemicals': len(chemical_data),
-                'total_regulations': len(all_regulations)
-            }
+            chemical_data_list = [chemical_data for chemical_data, _ in separated]
+            related_regulations_list = self._find_related_regulations_within(chemical_data_list, deadline)
+
+            structured_results = []
+            for query, (chemical_data, regulations), related_regulations in zip(queries, separated,
+                                                                                 related_regulations_list):
+                # 合并法规（去重）
+                all_regulations = self._merge_regulations(regulations, related_regulations)
+
+                structured_results.append({
+                    'query': query,
+                    'chemical_data': chemical_data,
+                    'regulations': all_regulations,
+                    'total_chemicals': len(chemical_data),
+                    'total_regulations': len(all_regulations)
+                })
+            return structured_results
 
         except Exception as e:
             logger.error(f"构建结构化结果失败: {e}")
-            return {"chemical_data": [], "regulations": [], "query": query}
+            return [{"chemical_data": [], "regulations": [], "query": query} for query in queries]
 
-    def _find_related_regulations(self, chemical_data: List[Dict], query: str) -> List[Dict]:
-        """为化学品数据查找相关法规"""
+    def _build_page(self, basic_results: List[Dict], query: str, strategy: str, top_k: int,
+                    page_size: int, offset: int, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        构建一页结构化结果
+
+        只为本页的化学品生成内容和查找相关法规；语义检索命中的法规放在第一页，
+        total_chemicals 为所有页的化学品总数，还有下一页时返回 next_cursor
+        """
+        chemical_data, regulations = self._split_results(basic_results)
+        page_chemicals = self._fill_chemical_contents(chemical_data[offset:offset + page_size])
+
+        related_regulations = self._find_related_regulations_within([page_chemicals], deadline)[0]
+        page_regulations = self._merge_regulations(regulations if offset == 0 else [], related_regulations)
+
+        next_offset = offset + page_size
+        return {
+            'query': query,
+            'chemical_data': page_chemicals,
+            'regulations': page_regulations,
+            'total_chemicals': len(chemical_data),
+            'total_regulations': len(page_regulations),
+            'offset': offset,
+            'next_cursor': self._encode_cursor(query, strategy, top_k, page_size, next_offset)
+                           if next_offset < len(chemical_data) else None
+        }
+
+    @staticmethod
+    def _split_results(basic_results: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """分离化学品数据和法规数据"""
+        chemical_data = []
+        regulations = []
+
+        for result in basic_results:
+            if result.get('metadata', {}).get('doc_type') == 'chemical':
+                chemical_data.append(result)
+            elif result.get('metadata', {}).get('doc_type') == 'regulation':
+                regulations.append(result)
+
+        return chemical_data, regulations
+
+    @staticmethod
+    def _has_structured_results(basic_results: List[Dict]) -> bool:
+        """基础搜索结果中是否有化学品或法规"""
+        return any(result.get('metadata', {}).get('doc_type') in ('chemical', 'regulation')
+                   for result in basic_results)
+
+    def _fill_chemical_contents(self, chemical_data: List[Dict]) -> List[Dict]:
+        """为精确搜索的化学品结果生成可读内容（延迟到确定要返回时才生成）"""
+        for result in chemical_data:
+            if result.get('content') is None and result.get('chemical_data'):
+                result['content'] = self._format_chemical_content(result['chemical_data'])
+        return chemical_data
+
+    @staticmethod
+    def _encode_cursor(query: str, strategy: str, top_k: int, page_size: int, offset: int) -> str:
+        """生成分页游标（检索参数和偏移量的URL安全编码）"""
+        payload = json.dumps([query, strategy, top_k, page_size, offset], ensure_ascii=False)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, query: str) -> Tuple[str, int, int, int]:
+        """解析分页游标，返回 (检索策略, top_k, 分页大小, 偏移量)"""
+        try:
+            cursor_query, strategy, top_k, page_size, offset = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            top_k, page_size, offset = int(top_k), int(page_size), int(offset)
+        except Exception:
+            raise ValueError(f"无效的分页游标: {cursor}")
+        if not isinstance(strategy, str) or top_k <= 0 or page_size <= 0 or offset < 0:
+            raise ValueError(f"无效的分页游标: {cursor}")
+        if cursor_query != query:
+            raise ValueError("分页游标与查询不匹配")
+        return strategy, top_k, page_size, offset
+
+    def _find_related_regulations_within(self, chemical_data_list: List[List[Dict]],
+                                         deadline: Optional[Deadline] = None) -> List[List[Dict]]:
+        """在时间预算内查找相关法规，超时时各组均不附加相关法规"""
+        if not any(chemical_data_list):
+            return [[] for _ in chemical_data_list]
+        return self._run_stage(deadline, 'regulations',
+                               lambda: self._find_related_regulations(chemical_data_list, deadline),
+                               default=lambda: [[] for _ in chemical_data_list])
+
+    @metrics.timed('regulation_linking')
+    def _find_related_regulations(self, chemical_data_list: List[List[Dict]],
+                                  deadline: Optional[Deadline] = None) -> List[List[Dict]]:
+        """
+        为每组化学品数据查找相关法规
+
+        所有化学品的检索词先汇总：特殊规定编号一次查表，其余检索词一次批量检索，
+        需要按危险类别补充检索的各组也合并为一次批量检索
+        """
         try:
-            related_regulations = []
-            found_specific = False
-
-            for chemical in chemical_data:
-                chemical_info = chemical.get('chemical_data', {})
-
-                # 优先搜索特殊规定编号（最精确的匹配）
-                if chemical_info.get('special_provisions'):
-                    provisions = str(chemical_info['special_provisions']).split()
-                    for provision in provisions:
-                        if provision.isdigit():
-                            # 搜索特殊规定编号
-                            regulations = self.vector_handler.semantic_search(provision, top_k=5)
-                            for reg in regulations:
-                                if (reg.get('metadata', {}).get('source') == 'appendix_a' and
-                                    reg not in related_regulations):
-                                    related_regulations.append(reg)
-                                    found_specific = True
-
-                # 如果通过特殊规定找到了法规，就不再进行通用搜索
-                if found_specific:
-                    continue
-
-                # 搜索UN编号相关法规
-                if chemical_info.get('un_number'):
-                    un_number = str(chemical_info['un_number'])
-                    regulations = self.vector_handler.semantic_search(un_number, top_k=3)
-                    for reg in regulations:
-                        if (reg.get('metadata', {}).get('source') == 'appendix_a' and
-                            reg not in related_regulations):
-                            related_regulations.append(reg)
-                            found_specific = True
-
-                # 搜索化学品名称关键词
-                if not found_specific and chemical_info.get('chinese_name'):
-                    name = chemical_info['chinese_name']
-                    specific_terms = []
-
-                    # 提取具体的化学品类型关键词
-                    if '电池' in name:
-                        specific_terms.extend(['电池', '锂电池', '锂离子'])
-                    if '黏合剂' in name or '胶' in name:
-                        specific_terms.extend(['黏合剂', '胶水', '胶'])
-                    if '汽油' in name:
-                        specific_terms.extend(['汽油', '燃料'])
-                    if '乙醇' in name:
-                        specific_terms.extend(['乙醇', '酒精'])
-
-                    # 搜索具体关键词
-                    for term in specific_terms[:3]:
-                        regulations = self.vector_handler.semantic_search(term, top_k=3)
-                        for reg in regulations:
-                            if (reg.get('metadata', {}).get('source') == 'appendix_a' and
-                                reg not in related_regulations):
-                                related_regulations.append(reg)
-                                found_specific = True
-
-            # 只有在完全没有找到特定法规时，才使用通用搜索
-            if not found_specific:
-                # 根据危险类别搜索
-                categories = set()
-                for chemical in chemical_data:
-                    chemical_info = chemical.get('chemical_data', {})
-                    if chemical_info.get('category'):
-                        categories.add(chemical_info['category'])
-
-                for category in list(categories)[:2]:  # 最多搜索2个类别
-                    category_terms = [f"第{category}类", f"类别{category}"]
-                    for term in category_terms:
-                        regulations = self.vector_handler.semantic_search(term, top_k=2)
-                        for reg in regulations:
-                            if (reg.get('metadata', {}).get('source') == 'appendix_a' and
-                                reg not in related_regulations):
-                                related_regulations.append(reg)
-
-            # 按相似度排序并限制数量
-            related_regulations.sort(key=lambda x: x.get('score', 0), reverse=True)
-            return related_regulations[:3]  # 最多返回3个相关法规
+            search_plans_list = [[regulation_search_terms(chemical.get('chemical_data', {}))
+                                  for chemical in chemical_data]
+                                 for chemical_data in chemical_data_list]
+            all_plans = [plan for search_plans in search_plans_list for plan in search_plans]
+            provision_results = self.vector_handler.get_regulations_by_provisions(
+                list(dict.fromkeys(number for plan in all_plans for number in plan[0])))
+            search_results = self._search_regulations(
+                [term for plan in all_plans for terms in plan[1:] for term in terms], top_k=TERM_TOP_K)
+
+            related_list = []
+            category_terms_list = []
+            for chemical_data, search_plans in zip(chemical_data_list, search_plans_list):
+                related_regulations = {}
+                found_specific = False
+                for provision_numbers, un_terms, name_terms in search_plans:
+                    # 优先按特殊规定编号查找（最精确的匹配）
+                    for number in provision_numbers:
+                        found_specific = self._collect_regulations(
+                            related_regulations, provision_results.get(number, []), 5) or found_specific
+
+                    # 如果通过特殊规定找到了法规，就不再进行通用搜索
+                    if found_specific:
+                        continue
+
+                    # 搜索UN编号相关法规
+                    for term in un_terms:
+                        found_specific = self._collect_regulations(
+                            related_regulations, search_results.get(term, []), 3) or found_specific
+
+                    # 搜索化学品名称关键词
+                    if not found_specific:
+                        for term in name_terms:
+                            found_specific = self._collect_regulations(
+                                related_regulations, search_results.get(term, []), 3) or found_specific
+
+                # 只有在完全没有找到特定法规时，才使用通用搜索（根据危险类别）
+                related_list.append(related_regulations)
+                category_terms_list.append([] if found_specific else self._category_search_terms(chemical_data))
+
+            # 超时时不再按危险类别补充检索
+            if not self._check_deadline(deadline, 'regulations'):
+                category_terms_list = [[] for _ in category_terms_list]
+            category_results = self._search_regulations(
+                [term for category_terms in category_terms_list for term in category_terms], top_k=CATEGORY_TOP_K)
+
+            results = []
+            for related_regulations, category_terms in zip(related_list, category_terms_list):
+                for term in category_terms:
+                    self._collect_regulations(related_regulations, category_results.get(term, []), 2)
+
+                # 按相似度排序并限制数量
+                sorted_regulations = sorted(related_regulations.values(),
+                                            key=lambda x: x.get('score', 0), reverse=True)
+                results.append(sorted_regulations[:3])  # 最多返回3个相关法规
+            return results
 
         except Exception as e:
             logger.error(f"查找相关法规失败: {e}")
-            return []
+            return [[] for _ in chemical_data_list]
+
+    @staticmethod
+    def _collect_regulations(related_regulations: Dict[Any, Dict], results: List[Dict], limit: int) -> bool:
+        """收集法规结果，返回是否有新增"""
+        added = False
+        for reg in results[:limit]:
+            reg_id = reg.get('id', reg['metadata'].get('id'))
+            if reg_id not in related_regulations:
+                related_regulations[reg_id] = reg
+                added = True
+        return added
+
+    def _category_search_terms(self, chemical_data: List[Dict]) -> List[str]:
+        """按危险类别生成通用法规检索词"""
+        categories = set()
+        for chemical in chemical_data:
+            chemical_info = chemical.get('chemical_data', {})
+            if chemical_info.get('category'):
+                categories.add(chemical_info['category'])
+
+        return category_search_terms(list(categories)[:2])  # 最多搜索2个类别
+
+    def _search_regulations(self, terms: List[str], top_k: int) -> Dict[str, List[Dict]]:
+        """批量检索附录A法规，返回 检索词 -> 结果列表（优先查预计算的法规关联表）"""
+        unique_terms = list(dict.fromkeys(terms))
+        if not unique_terms:
+            return {}
+
+        results = {}
+        links = self._get_regulation_links()
+        if links is not None:
+            for term in unique_terms:
+                ranked = links.lookup(term, top_k)
+                if ranked is not None:
+                    results[term] = self.vector_handler.get_documents(ranked)
+
+        # 关联表未收录的检索词实时检索
+        missing_terms = [term for term in unique_terms if term not in results]
+        if missing_terms:
+            results.update(zip(missing_terms, self.vector_handler.semantic_search_batch(
+                missing_terms, top_k=top_k, filter=REGULATION_FILTER)))
+        return results
+
+    def _get_regulation_links(self) -> Optional[RegulationLinks]:
+        """获取与当前向量索引一致的法规关联表（索引变化后重新加载）"""
+        if not Settings.REGULATION_LINKS_ENABLED:
+            return None
+
+        index_version = self.vector_handler.index_version
+        if self._regulation_links_version != index_version:
+            try:
+                self._regulation_links = RegulationLinks.load(self.vector_handler.regulation_links_path,
+                                                              self.vector_handler.get_index_fingerprint())
+            except Exception as e:
+                logger.error(f"加载法规关联表失败: {e}")
+                self._regulation_links = None
+            self._regulation_links_version = index_version
+        return self._regulation_links
 
     def _merge_regulations(self, regulations1: List[Dict], regulations2: List[Dict]) -> List[Dict]:
         """合并法规列表，去重"""
@@ -488,7 +1189,8 @@ class HybridRetriever:
             logger.error(f"合并法规失败: {e}")
             return regulations1 + regulations2
 
-    def _fallback_search(self, query: str, top_k: int = 5, verbose: bool = False) -> Dict[str, Any]:
+    def _fallback_search(self, query: str, top_k: int = 5, verbose: bool = False,
+                         deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         备用搜索：当主搜索没有结果时，尝试提取化学品名称进行搜索
 
@@ -496,33 +1198,18 @@ class HybridRetriever:
             query: 原始查询
             top_k: 返回结果数量
             verbose: 是否显示详细日志
+            deadline: 时间预算
 
         Returns:
             包含化学品数据和法规的字典
         """
         try:
-            # 提取可能的化学品名称
-            chemical_names = self._extract_chemical_names(query)
-
-            if not chemical_names:
-                return {"chemical_data": [], "regulations": [], "query": query}
-
-            if verbose:
-                print(f"   提取到的化学品名称: {chemical_names}")
-
-            # 对每个提取的化学品名称进行搜索
-            all_results = []
-            for name in chemical_names:
-                # 使用混合搜索策略
-                results = self._hybrid_search(name, top_k, False)
-                if results:
-                    all_results.extend(results)
-
+            all_results = self._fallback_results(query, top_k, verbose, deadline)
             if not all_results:
                 return {"chemical_data": [], "regulations": [], "query": query}
 
             # 构建结构化结果
-            structured_result = self._build_structured_result(all_results, query, verbose)
+            structured_result = self._build_structured_result(all_results, query, verbose, deadline)
 
             if verbose and (structured_result.get('chemical_data') or structured_result.get('regulations')):
                 print(f"   备用搜索成功，找到 {len(structured_result.get('chemical_data', []))} 条化学品数据")
@@ -533,68 +1220,32 @@ class HybridRetriever:
             logger.error(f"备用搜索失败: {e}")
             return {"chemical_data": [], "regulations": [], "query": query}
 
-    def _extract_chemical_names(self, query: str) -> List[str]:
-        """
-        从查询中提取可能的化学品名称
+    @metrics.timed('fallback')
+    def _fallback_results(self, query: str, top_k: int = 5, verbose: bool = False,
+                          deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        """备用搜索的基础搜索结果：对从查询中提取的化学品名称分别执行混合搜索（超时时不再搜索后面的名称）"""
+        try:
+            # 提取可能的化学品名称
+            chemical_names = self.query_analyzer.analyze(query).names
 
-        Args:
-            query: 查询字符串
+            if not chemical_names:
+                return []
 
-        Returns:
-            提取的化学品名称列表
-        """
-        try:
-            chemical_names = []
-
-            # 常见的查询模式和对应的化学品名称提取
-            patterns = [
-                # "XX存储要求" -> "XX"
-                r'(.+?)存储要求',
-                r'(.+?)储存要求',
-                r'(.+?)保存要求',
-                # "XX的存储要求" -> "XX"
-                r'(.+?)的存储要求',
-                r'(.+?)的储存要求',
-                r'(.+?)的保存要求',
-                # "XX运输要求" -> "XX"
-                r'(.+?)运输要求',
-                r'(.+?)的运输要求',
-                # "XX安全要求" -> "XX"
-                r'(.+?)安全要求',
-                r'(.+?)的安全要求',
-                # "XX包装要求" -> "XX"
-                r'(.+?)包装要求',
-                r'(.+?)的包装要求',
-                # "XX危险性" -> "XX"
-                r'(.+?)危险性',
-                r'(.+?)的危险性',
-                # "XX注意事项" -> "XX"
-                r'(.+?)注意事项',
-                r'(.+?)的注意事项',
-                # "XX规定" -> "XX"
-                r'(.+?)规定',
-                r'(.+?)的规定',
-            ]
+            if verbose:
+                print(f"   提取到的化学品名称: {chemical_names}")
 
-            for pattern in patterns:
-                import re
-                match = re.search(pattern, query)
-                if match:
-                    name = match.group(1).strip()
-                    # 过滤掉过短或包含特殊字符的名称
-                    if len(name) >= 2 and not re.search(r'[0-9]{3,}', name):
-                        chemical_names.append(name)
-
-            # 去重并保持顺序
-            seen = set()
-            unique_names = []
+            # 对每个提取的化学品名称进行搜索
+            all_results = []
             for name in chemical_names:
-                if name not in seen:
-                    seen.add(name)
-                    unique_names.append(name)
+                if not self._check_deadline(deadline, 'fallback'):
+                    break
+                # 使用混合搜索策略
+                results = self._hybrid_search(name, top_k, False, deadline)
+                if results:
+                    all_results.extend(results)
 
-            return unique_names[:3]  # 最多返回3个名称
+            return all_results
 
         except Exception as e:
-            logger.error(f"提取化学品名称失败: {e}")
+            logger.error(f"备用搜索失败: {e}")
             return []
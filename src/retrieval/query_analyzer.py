@@ -0,0 +1,170 @@
+"""
+查询分析模块
+检索前对查询做一次分析：预编译的正则提取UN编号和规定代码，关键词自动机一次扫描找出化学品关键词、
+同义词扩展的触发词和意图后缀，得到供各路检索共用的 ParsedQuery。
+关键词、同义词扩展规则和意图后缀来自数据文件（默认 config/query_keywords.json）
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple, Union
+
+from loguru import logger
+
+from src.database.code_index import CODE_FIELDS, normalize_code
+from src.utils.cache import LRUCache
+from src.utils.helpers import load_json
+from src.utils.keyword_automaton import KeywordAutomaton
+
+
+# UN编号："UN1133" / "UN 1133" 或单独的4位数字
+UN_NUMBER_PATTERN = re.compile(r'\bUN\s*(\d+)\b|\b(\d{4})\b', re.IGNORECASE)
+
+# 规定代码：(代码列, 模式)，如 "特殊规定188"、"SP188"、"P903"、"IBC02"、"T7"
+CODE_QUERY_PATTERNS = (
+    ('special_provisions', re.compile(r'(?:特殊规定|SP)\s*(\d{1,4})(?!\d)', re.IGNORECASE)),
+    ('packaging_instruction', re.compile(r'(?<![A-Za-z0-9])((?:P|IBC|LP)\d{2,3}(?:\([a-z]\))?)(?!\d)')),
+    ('portable_tank_instruction', re.compile(r'(?<![A-Za-z0-9])(T\d{1,2})(?!\d)')),
+)
+
+# 提取的化学品名称不能包含3位以上的数字
+NAME_DIGITS_PATTERN = re.compile(r'[0-9]{3,}')
+
+
+class ParsedQuery:
+    """查询分析结果（只读，可在多路检索间共享）"""
+
+    def __init__(self, text: str, un_numbers: Tuple[int, ...], keywords: Tuple[str, ...],
+                 names: Tuple[str, ...], intents: Tuple[str, ...], expansions: Tuple[str, ...],
+                 codes: Tuple[Tuple[str, Union[int, str]], ...] = ()):
+        self.text = text
+        self.un_numbers = un_numbers    # 查询中的UN编号（按出现顺序，可重复）
+        self.codes = codes              # 查询中的规定代码 (代码列, 代码)，如 ('special_provisions', 188)
+        self.keywords = keywords        # 命中的化学品关键词
+        self.names = names              # 按意图后缀提取的化学品名称
+        self.intents = intents          # 查询意图，如 storage、transport
+        self.expansions = expansions    # 同义词扩展的检索词
+
+    @property
+    def query_type(self) -> str:
+        """查询类型：un_number / code_search / name_search / natural_language"""
+        if self.un_numbers:
+            return "un_number"
+        if self.codes:
+            return "code_search"
+        if self.keywords:
+            return "name_search"
+        return "natural_language"
+
+    def __repr__(self):
+        return (f"ParsedQuery(text={self.text!r}, type={self.query_type}, un_numbers={self.un_numbers}, "
+                f"codes={self.codes}, names={self.names}, intents={self.intents}, expansions={self.expansions})")
+
+
+class QueryAnalyzer:
+    """查询分析器"""
+
+    # 分析结果缓存大小
+    CACHE_SIZE = 4096
+
+    # 最多提取的化学品名称数量
+    MAX_NAMES = 3
+
+    def __init__(self, keywords_file: str):
+        """
+        Args:
+            keywords_file: 关键词数据文件（JSON），包含：
+                chemical_keywords: 化学品名称关键词，命中时按名称查询处理
+                expansions: 同义词扩展规则 {group, match, terms}，match中的词全部出现时扩展为terms，
+                            同一group内只采用排在最前的一条规则
+                intent_suffixes: 意图后缀 {suffix, intent}，后缀之前的文本作为化学品名称
+        """
+        # 缺少关键词文件时所有查询都会被识别为自然语言查询，同义词扩展也不再生效，直接报错
+        if not os.path.isfile(keywords_file):
+            raise FileNotFoundError(f"查询关键词文件不存在: {keywords_file}（检查 QUERY_KEYWORDS_FILE 配置）")
+        data = load_json(keywords_file)
+        if not data.get('chemical_keywords'):
+            logger.error(f"查询关键词文件中没有化学品关键词: {keywords_file}，查询将无法识别为名称查询")
+
+        self.chemical_keywords = set(data.get('chemical_keywords', []))
+
+        # 同义词扩展规则：(分组, 触发词, 扩展词)，及 触发词 -> 规则序号
+        self.expansion_rules = []
+        self._rules_by_keyword: Dict[str, List[int]] = {}
+        for index, rule in enumerate(data.get('expansions', [])):
+            match = tuple(dict.fromkeys(rule.get('match', [])))
+            self.expansion_rules.append((rule.get('group', index), match, tuple(rule.get('terms', []))))
+            for keyword in match:
+                self._rules_by_keyword.setdefault(keyword, []).append(index)
+
+        # 意图后缀（按文件中的顺序提取名称）
+        self.intent_suffixes = [(item['suffix'], item.get('intent')) for item in data.get('intent_suffixes', [])]
+        self._suffixes = {suffix for suffix, _ in self.intent_suffixes}
+
+        self.automaton = KeywordAutomaton(list(self.chemical_keywords) + list(self._rules_by_keyword)
+                                          + list(self._suffixes))
+        self._cache = LRUCache(self.CACHE_SIZE)
+
+    def analyze(self, query: str) -> ParsedQuery:
+        """分析查询（相同查询直接返回缓存的结果）"""
+        parsed = self._cache.get(query)
+        if parsed is None:
+            parsed = self._analyze(query)
+            self._cache.put(query, parsed)
+        return parsed
+
+    def _analyze(self, query: str) -> ParsedQuery:
+        un_numbers = tuple(int(un_number or digits) for un_number, digits in UN_NUMBER_PATTERN.findall(query))
+
+        codes = []
+        for field, pattern in CODE_QUERY_PATTERNS:
+            for match in pattern.findall(query):
+                code = normalize_code(match, CODE_FIELDS[field])
+                if code is not None and (field, code) not in codes:
+                    codes.append((field, code))
+
+        # 一次扫描找出所有关键词；意图后缀记录第一个前面有文本（同一行内）的出现位置
+        found = set()
+        keywords = []
+        suffix_positions = {}
+        for start, keyword in self.automaton.find_all(query):
+            found.add(keyword)
+            if keyword in self.chemical_keywords and keyword not in keywords:
+                keywords.append(keyword)
+            if keyword in self._suffixes and keyword not in suffix_positions:
+                line_start = query.rfind('\n', 0, start) + 1
+                if start > line_start:
+                    suffix_positions[keyword] = (line_start, start)
+
+        # 意图后缀之前的文本作为化学品名称
+        names = []
+        intents = []
+        for suffix, intent in self.intent_suffixes:
+            if suffix not in suffix_positions:
+                continue
+            if intent and intent not in intents:
+                intents.append(intent)
+            line_start, start = suffix_positions[suffix]
+            name = query[line_start:start].strip()
+            # 过滤掉过短或包含特殊字符的名称
+            if len(name) >= 2 and not NAME_DIGITS_PATTERN.search(name) and name not in names:
+                names.append(name)
+
+        return ParsedQuery(query, un_numbers, tuple(keywords), tuple(names[:self.MAX_NAMES]),
+                           tuple(intents), self._expand(found), tuple(codes))
+
+    def _expand(self, found: set) -> Tuple[str, ...]:
+        """同义词扩展：只检查触发词命中的规则，每个分组采用排在最前且触发词全部出现的规则"""
+        candidates = sorted({index for keyword in found for index in self._rules_by_keyword.get(keyword, ())})
+
+        groups = set()
+        expansions = []
+        for index in candidates:
+            group, match, terms = self.expansion_rules[index]
+            if group in groups or not found.issuperset(match):
+                continue
+            groups.add(group)
+            expansions.extend(terms)
+
+        # 去重并保持顺序
+        return tuple(dict.fromkeys(expansions))
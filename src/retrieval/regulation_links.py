@@ -0,0 +1,132 @@
+"""
+化学品法规关联表模块
+化学品的相关法规检索词（UN编号、名称关键词、危险类别）只取决于名录记录本身，
+构建索引时为名录中每条记录的检索词预先计算附录A文档块排名并保存在向量索引旁，
+查询时直接查表，不再执行向量检索
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from src.utils.helpers import load_json, save_json
+
+
+# 法规检索只在附录A中进行
+REGULATION_FILTER = {'source': 'appendix_a'}
+
+# 各类检索词的检索数量：UN编号和名称关键词取前3条，危险类别取前2条
+TERM_TOP_K = 3
+CATEGORY_TOP_K = 2
+
+
+def regulation_search_terms(chemical_info: Dict[str, Any]) -> Tuple[List[int], List[str], List[str]]:
+    """生成单个化学品的法规检索词：(特殊规定编号, UN编号, 名称关键词)"""
+    provision_numbers = []
+    if chemical_info.get('special_provisions'):
+        provision_numbers = [int(provision) for provision in str(chemical_info['special_provisions']).split()
+                             if provision.isdecimal()]
+
+    un_terms = [str(chemical_info['un_number'])] if chemical_info.get('un_number') else []
+
+    # 提取具体的化学品类型关键词
+    name_terms = []
+    name = chemical_info.get('chinese_name') or ''
+    if '电池' in name:
+        name_terms.extend(['电池', '锂电池', '锂离子'])
+    if '黏合剂' in name or '胶' in name:
+        name_terms.extend(['黏合剂', '胶水', '胶'])
+    if '汽油' in name:
+        name_terms.extend(['汽油', '燃料'])
+    if '乙醇' in name:
+        name_terms.extend(['乙醇', '酒精'])
+
+    return provision_numbers, un_terms, name_terms[:3]
+
+
+def category_search_terms(categories: Iterable[str]) -> List[str]:
+    """按危险类别生成通用法规检索词"""
+    category_terms = []
+    for category in categories:
+        category_terms.extend([f"第{category}类", f"类别{category}"])
+    return category_terms
+
+
+class RegulationLinks:
+    """法规关联表：(检索数量, 检索词) -> [(文档序号, 相似度), ...]"""
+
+    def __init__(self, searches: Dict[int, Dict[str, List[Tuple[int, float]]]], fingerprint: str,
+                 created_at: Optional[str] = None):
+        """
+        Args:
+            searches: 检索数量 -> {检索词: 排名结果}
+            fingerprint: 构建时的向量索引指纹，索引变化后关联表失效
+            created_at: 构建时间
+        """
+        self.searches = searches
+        self.fingerprint = fingerprint
+        self.created_at = created_at or datetime.now().isoformat()
+
+    @classmethod
+    def build(cls, vector_handler, chemicals: Iterable[Dict[str, Any]]) -> 'RegulationLinks':
+        """为名录中每条记录的法规检索词预先计算检索结果"""
+        terms = {TERM_TOP_K: {}, CATEGORY_TOP_K: {}}
+        for chemical in chemicals:
+            _, un_terms, name_terms = regulation_search_terms(chemical)
+            terms[TERM_TOP_K].update(dict.fromkeys(un_terms + name_terms))
+            if chemical.get('category'):
+                terms[CATEGORY_TOP_K].update(dict.fromkeys(category_search_terms([chemical['category']])))
+
+        searches = {}
+        for top_k, term_dict in terms.items():
+            term_list = list(term_dict)
+            ranked = vector_handler.rank_documents_batch(term_list, top_k=top_k, filter=REGULATION_FILTER)
+            searches[top_k] = dict(zip(term_list, ranked))
+
+        links = cls(searches, vector_handler.get_index_fingerprint())
+        logger.info(f"法规关联表构建完成，共 {len(links)} 个检索词")
+        return links
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str]) -> Optional['RegulationLinks']:
+        """加载关联表，文件不存在或与当前索引不一致时返回None"""
+        if not os.path.exists(path):
+            return None
+
+        data = load_json(path)
+        if not data:
+            return None
+        if data.get('fingerprint') != fingerprint:
+            logger.warning("法规关联表与当前向量索引不一致，改为实时检索相关法规（请重新构建向量数据库）")
+            return None
+
+        searches = {int(top_k): {term: [(int(idx), float(score)) for idx, score in ranked]
+                                 for term, ranked in term_results.items()}
+                    for top_k, term_results in data.get('searches', {}).items()}
+        return cls(searches, data['fingerprint'], data.get('created_at'))
+
+    def save(self, path: str) -> bool:
+        """保存关联表"""
+        return save_json({
+            'fingerprint': self.fingerprint,
+            'created_at': self.created_at,
+            'searches': {str(top_k): {term: [[idx, score] for idx, score in ranked]
+                                      for term, ranked in term_results.items()}
+                         for top_k, term_results in self.searches.items()}
+        }, path)
+
+    def __len__(self):
+        return sum(len(term_results) for term_results in self.searches.values())
+
+    def lookup(self, term: str, top_k: int) -> Optional[List[Tuple[int, float]]]:
+        """查找检索词的预计算结果，未收录时返回None"""
+        return self.searches.get(top_k, {}).get(term)
+
+    def stats(self) -> Dict[str, Any]:
+        """关联表状态"""
+        return {
+            'terms': {top_k: len(term_results) for top_k, term_results in self.searches.items()},
+            'created_at': self.created_at
+        }
@@ -0,0 +1,50 @@
+"""
+时间预算模块
+为一次检索设置截止时间，各阶段开始前检查剩余时间，并记录因超时被跳过或提前结束的阶段
+"""
+
+import time
+from typing import List, Optional
+
+
+class Deadline:
+    """一次检索的时间预算"""
+
+    def __init__(self, budget_ms: float):
+        """
+        Args:
+            budget_ms: 时间预算（毫秒）
+        """
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + max(budget_ms, 0) / 1000
+        self.skipped_stages: List[str] = []
+
+    def remaining(self) -> float:
+        """剩余时间（秒），已超时时为0"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """是否已超时"""
+        return time.monotonic() >= self.expires_at
+
+    def skip(self, stage: str):
+        """记录因超时被跳过或提前结束的阶段"""
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+
+    def check(self, stage: str) -> bool:
+        """检查阶段能否继续执行，已超时时记录该阶段并返回False"""
+        if self.expired():
+            self.skip(stage)
+            return False
+        return True
+
+    @property
+    def partial(self) -> bool:
+        """是否有阶段因超时未完整执行"""
+        return bool(self.skipped_stages)
+
+    @staticmethod
+    def create(budget_ms: Optional[float]) -> Optional['Deadline']:
+        """budget_ms为None时不限制时间"""
+        return Deadline(budget_ms) if budget_ms is not None else None
@@ -0,0 +1,69 @@
+"""
+关键词自动机模块
+基于Aho-Corasick算法的多关键词匹配：一次扫描文本即可找出所有关键词的出现位置，
+匹配耗时只与文本长度和命中次数有关，与关键词数量无关
+"""
+
+from collections import deque
+from typing import Iterable, List, Tuple
+
+
+class KeywordAutomaton:
+    """Aho-Corasick多关键词匹配自动机（构建后只读）"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: 关键词列表（空字符串和重复项会被忽略）
+        """
+        # 状态转移表、失败指针、每个状态结束的关键词
+        self._goto = [{}]
+        self._fail = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (keyword,)
+
+        # 按广度优先顺序计算失败指针，并合并后缀状态的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """
+        查找文本中所有关键词的出现位置（可重叠）
+
+        Returns:
+            (起始位置, 关键词) 列表，按结束位置排序
+        """
+        matches = []
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                matches.append((position - len(keyword) + 1, keyword))
+        return matches
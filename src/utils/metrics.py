@@ -0,0 +1,140 @@
+"""
+检索指标模块
+记录检索流程各阶段的耗时（span），按 阶段 + 检索策略 汇总为进程内的延迟直方图，
+可导出各阶段 p50/p95/p99 的指标快照
+"""
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from config.settings import Settings
+
+
+# 直方图桶上界（毫秒）：0.01ms 到约 100s，相邻桶相差 10%，分位数的相对误差不超过 10%
+BUCKET_BOUNDS = tuple(0.01 * 1.1 ** i for i in range(170))
+
+# 未设置检索策略时（如构建索引时的向量检索）记录的策略名
+NO_STRATEGY = 'none'
+
+# 当前检索策略（随调用上下文传递到线程中执行的各阶段）
+_current_strategy = contextvars.ContextVar('retrieval_strategy', default=NO_STRATEGY)
+
+
+class LatencyHistogram:
+    """延迟直方图（固定的指数分桶，内存占用与样本数无关）"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, percent: float) -> float:
+        """估算分位数（取样本所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(self.count * percent / 100 + 0.5))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[bucket] if bucket < len(BUCKET_BOUNDS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_ms, 3)
+        }
+
+
+class MetricsRegistry:
+    """检索阶段耗时统计（线程安全）"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat()
+
+    def record(self, stage: str, elapsed_ms: float, strategy: Optional[str] = None):
+        """记录一次阶段耗时，strategy为None时使用当前上下文的检索策略"""
+        if not self.enabled:
+            return
+        key = (stage, strategy or _current_strategy.get())
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(elapsed_ms)
+
+    @contextmanager
+    def span(self, stage: str, strategy: Optional[str] = None) -> Iterator[None]:
+        """记录代码块的耗时（异常退出时同样记录）"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000, strategy)
+
+    def timed(self, stage: str) -> Callable:
+        """记录函数耗时的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def strategy(self, strategy: str) -> Iterator[None]:
+        """设置代码块内各阶段记录的检索策略"""
+        token = _current_strategy.set(strategy)
+        try:
+            yield
+        finally:
+            _current_strategy.reset(token)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出指标快照
+
+        Returns:
+            {'started_at': 开始统计的时间, 'stages': {阶段: {检索策略: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}}}
+        """
+        with self._lock:
+            stages = {}
+            for (stage, strategy), histogram in sorted(self._histograms.items()):
+                stages.setdefault(stage, {})[strategy] = histogram.snapshot()
+            return {'started_at': self.started_at, 'stages': stages}
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._histograms.clear()
+            self.started_at = datetime.now().isoformat()
+
+
+# 进程内共享的指标（HybridRetriever 和 VectorHandler 共用）
+metrics = MetricsRegistry(enabled=Settings.METRICS_ENABLED)
@@ -4,19 +4,35 @@ FAISS向量数据库处理模块
 """
 
 import os
+import re
 import json
+import math
 import pickle
+import shutil
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 import numpy as np
 import faiss
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 import jieba
 from loguru import logger
 from tqdm import tqdm
 
 from config.settings import Settings
-from src.data_processing.text_processor import TextProcessor
+from src.data_processing.text_processor import TextProcessor, CHEMICAL_DOCUMENT_FIELDS
+from src.data_processing.tokenizer import TokenCache, tokenize
+from src.vector_db.sparse_index import SparseInvertedIndex
+from src.vector_db.document_store import DocumentStore
+from src.vector_db.segment_store import SegmentStore
+from src.utils.cache import LRUCache
+from src.utils.metrics import metrics
+
+
+# index factory 中的乘积量化（PQ/OPQ）子量化器数量M，要求输入维度是M的倍数
+PQ_SUBQUANTIZER_PATTERN = re.compile(r'(?<![A-Za-z])O?PQ(\d+)')
+# 以指定输出维度的变换开头的 index factory（如 PCAR64、OPQ16_64），PQ的维度由变换决定
+DIMENSION_TRANSFORM_PATTERN = re.compile(r'^(?:PCAW?R?\d+|OPQ\d+_\d+|RR\d+|ITQ\d+)(?:,|$)')
 
 
 class SimpleTfidfVectorizer:
@@ -34,35 +50,58 @@ class SimpleTfidfVectorizer:
             stop_words=None
         )
         self.is_fitted = False
+        # 构建索引时挂载的分词缓存（不随向量化器保存）
+        self.token_cache = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['token_cache'] = None
+        return state
 
     def _chinese_tokenizer(self, text):
         """中文分词器"""
-        # 使用jieba进行中文分词
-        words = list(jieba.cut(text))
-        # 过滤短词和停用词
-        filtered_words = [word.strip() for word in words
-                         if len(word.strip()) > 1 and word.strip() not in ['的', '是', '在', '有', '和', '或', '等', '及']]
-        return filtered_words
-
-    def fit_transform(self, documents):
-        """训练并转换文档"""
+        token_cache = getattr(self, 'token_cache', None)
+        if token_cache is not None:
+            tokens = token_cache.get(text)
+            if tokens is not None:
+                return tokens
+        return tokenize(text)
+
+    def fit_transform_sparse(self, documents):
+        """训练并转换文档，返回CSR稀疏矩阵"""
         logger.info(f"正在训练TF-IDF模型，文档数量: {len(documents)}")
         vectors = self.vectorizer.fit_transform(documents)
         self.is_fitted = True
         logger.info(f"TF-IDF训练完成，特征维度: {vectors.shape[1]}")
-        return vectors.toarray().astype('float32')
+        return vectors.astype('float32')
 
-    def transform(self, documents):
-        """转换文档"""
+    def transform_sparse(self, documents):
+        """转换文档，返回CSR稀疏矩阵"""
         if not self.is_fitted:
             raise ValueError("向量化器尚未训练")
-        vectors = self.vectorizer.transform(documents)
-        return vectors.toarray().astype('float32')
+        return self.vectorizer.transform(documents).astype('float32')
+
+    def fit_transform(self, documents):
+        """训练并转换文档"""
+        return self.fit_transform_sparse(documents).toarray()
+
+    def transform(self, documents):
+        """转换文档"""
+        return self.transform_sparse(documents).toarray()
 
 
 class VectorHandler:
     """FAISS向量数据库处理器"""
 
+    # 索引不支持预过滤时，带过滤条件检索的候选放大倍数
+    FILTER_OVERSAMPLE = 10
+
+    # 导入MySQL数据时每批读取的行数（增量导入时同时作为每个新段的文档数量）
+    IMPORT_BATCH_SIZE = 1000
+
+    # 各索引模式的索引文件
+    INDEX_FILES = {'sparse': 'sparse_index.npz', 'dense': 'faiss_index.index'}
+
     def __init__(self):
         self.config = Settings.get_vector_db_config()
         self.text_processor = TextProcessor()
@@ -70,17 +109,37 @@ class VectorHandler:
         # 确保向量数据库目录存在
         os.makedirs(self.config['path'], exist_ok=True)
 
+        # 索引模式：sparse使用倒排稀疏索引，dense使用FAISS稠密索引
+        self.index_mode = self.config['index_mode']
+        self.index_factory = self.config['index_factory']
+
         # 文件路径
-        self.index_path = os.path.join(self.config['path'], 'faiss_index.index')
+        index_file = self.INDEX_FILES['sparse' if self.index_mode == 'sparse' else 'dense']
+        self.index_path = os.path.join(self.config['path'], index_file)
+        self.segments_path = os.path.join(self.config['path'], 'segments')
+        self.vectorizer_path = os.path.join(self.config['path'], 'vectorizer.pkl')
+        self.token_cache_path = os.path.join(self.config['path'], 'token_cache.pkl')
+        self.regulation_links_path = os.path.join(self.config['path'], 'regulation_links.json')
+
+        # 旧版本的文档和元数据文件（仅用于迁移）
+        self.store_path = os.path.join(self.config['path'], 'docstore')
         self.metadata_path = os.path.join(self.config['path'], 'metadata.json')
         self.documents_path = os.path.join(self.config['path'], 'documents.pkl')
-        self.vectorizer_path = os.path.join(self.config['path'], 'vectorizer.pkl')
 
         # 初始化向量化器
         self.vectorizer = SimpleTfidfVectorizer()
+        self.token_cache = None
+
+        # 查询向量缓存和检索结果缓存，索引变化时通过版本号自动失效
+        self.index_version = 0
+        self.vector_cache = LRUCache(Settings.VECTOR_CACHE_SIZE, Settings.VECTOR_CACHE_TTL)
+        self.result_cache = LRUCache(Settings.VECTOR_CACHE_SIZE, Settings.VECTOR_CACHE_TTL)
+        self._filter_masks = {}
+        self._provision_index = None
 
         # 初始化FAISS索引
         self.index = None
+        self.segments = None
         self.documents = []
         self.metadata = []
         self._load_or_create_index()
@@ -88,24 +147,24 @@ class VectorHandler:
     def _load_or_create_index(self):
         """加载或创建FAISS索引"""
         try:
-            if (os.path.exists(self.index_path) and
-                os.path.exists(self.metadata_path) and
-                os.path.exists(self.documents_path) and
-                os.path.exists(self.vectorizer_path)):
-
-                # 加载现有索引
-                self.index = faiss.read_index(self.index_path)
+            self._close_segments()
+            self.segments = SegmentStore(self.segments_path)
 
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    self.metadata = json.load(f)
+            if len(self.segments) == 0 and os.path.exists(self.vectorizer_path):
+                self._migrate_legacy_documents()
 
-                with open(self.documents_path, 'rb') as f:
-                    self.documents = pickle.load(f)
+            if len(self.segments) > 0 and os.path.exists(self.vectorizer_path):
 
                 with open(self.vectorizer_path, 'rb') as f:
                     self.vectorizer = pickle.load(f)
 
-                logger.info(f"加载现有索引，包含 {len(self.metadata)} 个文档")
+                # 加载现有索引，文档和元数据通过mmap按需读取
+                self.index = self._restore_index()
+                self.documents = self.segments.texts()
+                self.metadata = self.segments.metadatas()
+
+                logger.info(f"加载现有索引，包含 {len(self.metadata)} 个文档，"
+                            f"{self.segments.segment_count} 个段")
             else:
                 # 创建新索引（将在第一次添加数据时初始化）
                 self.index = None
@@ -119,23 +178,23 @@ class VectorHandler:
             raise
     
     def import_mysql_data(self, mysql_handler) -> bool:
-        """从MySQL导入化学品数据"""
+        """从MySQL导入化学品数据（流式读取，只查询构建文档需要的列）"""
         try:
             logger.info("开始从MySQL导入化学品数据...")
 
-            # 获取所有化学品数据
-            chemicals = mysql_handler.get_all_chemicals()
-            if not chemicals:
-                logger.warning("没有找到化学品数据")
-                return False
-
-            logger.info(f"找到 {len(chemicals)} 条化学品记录")
+            # 向量化器已训练时（增量导入）按批写入新段；首次构建需要完整语料训练向量化器
+            incremental = self.index is not None
 
             # 准备批量数据
             documents = []
             metadatas = []
+            chemical_count = 0
+            imported_count = 0
 
+            chemicals = mysql_handler.iter_chemicals(CHEMICAL_DOCUMENT_FIELDS, self.IMPORT_BATCH_SIZE)
             for chemical in tqdm(chemicals, desc="处理化学品数据"):
+                chemical_count += 1
+
                 # 创建文档文本
                 doc_text = self.text_processor.create_chemical_document(chemical)
                 if not doc_text:
@@ -155,11 +214,23 @@ class VectorHandler:
                 }
                 metadatas.append(metadata)
 
+                if incremental and len(documents) >= self.IMPORT_BATCH_SIZE:
+                    self._add_documents_batch(documents, metadatas)
+                    imported_count += len(documents)
+                    documents, metadatas = [], []
+
+            if chemical_count == 0:
+                logger.warning("没有找到化学品数据")
+                return False
+
+            logger.info(f"找到 {chemical_count} 条化学品记录")
+
             # 批量向量化和添加
             if documents:
                 self._add_documents_batch(documents, metadatas)
+                imported_count += len(documents)
 
-            logger.info(f"MySQL数据导入完成，共导入 {len(documents)} 条记录")
+            logger.info(f"MySQL数据导入完成，共导入 {imported_count} 条记录")
             return True
 
         except Exception as e:
@@ -169,32 +240,42 @@ class VectorHandler:
     def _add_documents_batch(self, documents: List[str], metadatas: List[Dict]):
         """批量添加文档到向量数据库"""
         try:
-            # 如果是第一次添加文档，需要训练向量化器并创建索引
-            if self.index is None:
-                logger.info("首次添加文档，训练向量化器...")
-                vectors = self.vectorizer.fit_transform(documents)
-
-                # 创建FAISS索引
-                dimension = vectors.shape[1]
-                self.index = faiss.IndexFlatIP(dimension)
-                logger.info(f"创建FAISS索引，维度: {dimension}")
-            else:
-                # 使用已训练的向量化器
-                logger.info("向量化文档...")
-                vectors = self.vectorizer.transform(documents)
-
-            # 标准化向量（用于余弦相似度）
-            faiss.normalize_L2(vectors)
+            # 先并行分词（已缓存的文本跳过），向量化时直接复用分词结果
+            token_cache = self._get_token_cache()
+            if token_cache is not None:
+                token_cache.prefetch(documents)
+                token_cache.save()
+            self.vectorizer.token_cache = token_cache
+
+            try:
+                # 如果是第一次添加文档，需要训练向量化器并创建索引
+                vectorizer_changed = self.index is None
+                if self.index is None:
+                    logger.info("首次添加文档，训练向量化器...")
+                    vectors = self.vectorizer.fit_transform_sparse(documents)
+                    self.index = self._create_index(vectors.shape[1])
+                    if not self.index.is_trained:
+                        logger.info(f"使用首批 {len(documents)} 个文档训练FAISS索引")
+                        self.index.train(self._prepare_vectors(vectors))
+
+                    # 向量化器只在训练后保存一次
+                    with open(self.vectorizer_path, 'wb') as f:
+                        pickle.dump(self.vectorizer, f)
+                else:
+                    # 使用已训练的向量化器
+                    logger.info("向量化文档...")
+                    vectors = self.vectorizer.transform_sparse(documents)
+            finally:
+                self.vectorizer.token_cache = None
 
             # 添加到索引
-            self.index.add(vectors)
+            self.index.add(self._prepare_vectors(vectors))
 
-            # 保存文档和元数据
-            self.documents.extend(documents)
-            self.metadata.extend(metadatas)
-
-            # 保存到磁盘
-            self._save_index()
+            # 本批文档写成新段，写入成本只与批次大小相关
+            self.segments.append(documents, metadatas, vectors)
+            self.documents = self.segments.texts()
+            self.metadata = self.segments.metadatas()
+            self._bump_index_version(vectorizer_changed)
 
             logger.info(f"成功添加 {len(documents)} 个文档到向量数据库")
 
@@ -202,27 +283,213 @@ class VectorHandler:
             logger.error(f"批量添加文档失败: {e}")
             raise
 
+    def _get_token_cache(self) -> Optional[TokenCache]:
+        """按需创建分词缓存（只在构建索引时加载）"""
+        if not Settings.TOKEN_CACHE_ENABLED:
+            return None
+        if self.token_cache is None:
+            self.token_cache = TokenCache(self.token_cache_path, Settings.TOKENIZER_WORKERS)
+        return self.token_cache
+
     def _save_index(self):
-        """保存索引到磁盘"""
+        """保存索引到磁盘，并在manifest中记录索引覆盖的文档数量"""
         try:
-            # 保存FAISS索引
-            faiss.write_index(self.index, self.index_path)
+            self._write_index_file()
+            self.segments.set_indexed_count(self.index_mode, self.index.ntotal, self._index_signature())
+
+        except Exception as e:
+            logger.error(f"保存索引失败: {e}")
+            raise
+
+    def compact(self) -> bool:
+        """合并所有段并持久化完整索引，加快下次加载"""
+        try:
+            if self.index is None:
+                return False
+
+            merged = self.segments.compact()
+            self.documents = self.segments.texts()
+            self.metadata = self.segments.metadatas()
 
-            # 保存元数据
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            # 需要训练的近似索引在完整语料上重新训练
+            if self.index_mode == 'dense' and self.index_factory != 'Flat':
+                self.index = self._build_index(self.segments.load_vectors(0))
+                self._bump_index_version()
 
-            # 保存文档
-            with open(self.documents_path, 'wb') as f:
-                pickle.dump(self.documents, f)
+            self._save_index()
 
-            # 保存向量化器
-            with open(self.vectorizer_path, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
+            logger.info(f"向量数据库合并完成，当前 {self.segments.segment_count} 个段，"
+                        f"{len(self.documents)} 个文档")
+            return merged
 
         except Exception as e:
-            logger.error(f"保存索引失败: {e}")
-            raise
+            logger.error(f"合并向量数据库失败: {e}")
+            return False
+
+    def _index_signature(self) -> Optional[str]:
+        """索引类型签名，用于判断持久化的索引文件是否可以复用"""
+        return self.index_factory if self.index_mode == 'dense' else None
+
+    def _create_index(self, dimension: int):
+        """按索引模式创建空索引"""
+        if self.index_mode == 'sparse':
+            logger.info(f"创建稀疏倒排索引，维度: {dimension}")
+            return SparseInvertedIndex(dimension)
+
+        # 通过FAISS index factory创建，如 Flat、IVF256,Flat、HNSW32、IVF256,PQ16
+        dimension = self._padded_dimension(dimension)
+        logger.info(f"创建FAISS索引（{self.index_factory}），维度: {dimension}")
+        try:
+            index = faiss.index_factory(dimension, self.index_factory, faiss.METRIC_INNER_PRODUCT)
+        except RuntimeError as e:
+            raise ValueError(f"无法按 FAISS_INDEX_FACTORY={self.index_factory!r} 创建维度为 {dimension} 的索引: {e}")
+        self._apply_search_params(index)
+        return index
+
+    def _padded_dimension(self, dimension: int) -> int:
+        """
+        FAISS索引的输入维度：PQ编码要求维度是子量化器数量M的倍数，TF-IDF词表大小不满足时
+        补零到M的倍数（补零不改变内积和向量长度）；以降维变换开头的索引类型由变换决定维度，不补零
+        """
+        if self.index_mode != 'dense' or DIMENSION_TRANSFORM_PATTERN.match(self.index_factory):
+            return dimension
+        multiple = 1
+        for subquantizers in PQ_SUBQUANTIZER_PATTERN.findall(self.index_factory):
+            multiple = math.lcm(multiple, int(subquantizers))
+        return -(-dimension // multiple) * multiple
+
+    def _build_index(self, vectors):
+        """创建索引，必要时用给定向量训练，再添加向量"""
+        vectors = self._prepare_vectors(vectors)
+        index = self._create_index(vectors.shape[1])
+        if not index.is_trained:
+            logger.info(f"训练FAISS索引，训练样本数量: {vectors.shape[0]}")
+            index.train(vectors)
+        index.add(vectors)
+        return index
+
+    def _apply_search_params(self, index):
+        """设置查询时参数（IVF的nprobe、HNSW的efSearch），用于在召回率和延迟之间取舍"""
+        if self.index_mode != 'dense':
+            return
+
+        parameter_space = faiss.ParameterSpace()
+        for name, value in [('nprobe', Settings.FAISS_NPROBE), ('efSearch', Settings.FAISS_EF_SEARCH)]:
+            try:
+                parameter_space.set_index_parameter(index, name, value)
+            except RuntimeError:
+                # 当前索引类型不支持该参数
+                pass
+
+    def _restore_index(self):
+        """从索引文件和未合并的段恢复索引"""
+        indexed_count = self.segments.get_indexed_count(self.index_mode, self._index_signature())
+        index = None
+        if indexed_count and os.path.exists(self.index_path):
+            index = self._read_index_file()
+            if index.ntotal != indexed_count:
+                logger.warning("索引文件与manifest不一致，从段数据重建索引")
+                index = None
+
+        if index is None:
+            return self._build_index(self.segments.load_vectors(0))
+
+        self._apply_search_params(index)
+        vectors = self.segments.load_vectors(indexed_count)
+        if vectors is not None:
+            index.add(self._prepare_vectors(vectors))
+        return index
+
+    def _migrate_legacy_documents(self):
+        """将旧格式（documents.pkl/metadata.json或docstore）的数据转换为段"""
+        if DocumentStore.exists(self.store_path):
+            store = DocumentStore(self.store_path)
+            documents, metadatas = list(store.texts()), list(store.metadatas())
+            store.close()
+        elif os.path.exists(self.documents_path) and os.path.exists(self.metadata_path):
+            with open(self.metadata_path, 'r', encoding='utf-8') as f:
+                metadatas = json.load(f)
+            with open(self.documents_path, 'rb') as f:
+                documents = pickle.load(f)
+        else:
+            return
+
+        if not documents:
+            return
+
+        logger.info("检测到旧格式的文档数据，转换为段存储...")
+        with open(self.vectorizer_path, 'rb') as f:
+            vectorizer = pickle.load(f)
+        self.segments.append(documents, metadatas, vectorizer.transform_sparse(documents))
+
+    def _close_segments(self):
+        """关闭段存储"""
+        if self.segments is not None:
+            self.segments.close()
+            self.segments = None
+
+    def _read_index_file(self):
+        """按索引模式读取索引文件"""
+        if self.index_mode == 'sparse':
+            return SparseInvertedIndex.load(self.index_path)
+        return faiss.read_index(self.index_path)
+
+    def _write_index_file(self):
+        """按索引模式写入索引文件"""
+        if self.index_mode == 'sparse':
+            self.index.save(self.index_path)
+        else:
+            faiss.write_index(self.index, self.index_path)
+
+    def _prepare_vectors(self, vectors):
+        """将TF-IDF稀疏向量转换为当前索引模式所需的格式（TF-IDF输出已做L2标准化）"""
+        if self.index_mode == 'sparse':
+            return vectors
+        dense = self._to_dense(vectors)
+        padding = self._padded_dimension(dense.shape[1]) - dense.shape[1]
+        if padding:
+            dense = np.pad(dense, ((0, 0), (0, padding)))
+        return dense
+
+    @staticmethod
+    def _to_dense(vectors) -> np.ndarray:
+        """将稀疏向量转换为FAISS所需的稠密float32矩阵并标准化（用于余弦相似度）"""
+        dense = np.ascontiguousarray(vectors.toarray(), dtype='float32')
+        faiss.normalize_L2(dense)
+        return dense
+
+    def _bump_index_version(self, vectorizer_changed: bool = False):
+        """索引内容变化后递增版本号并清空缓存"""
+        self.index_version += 1
+        self.result_cache.clear()
+        self._filter_masks = {}
+        self._provision_index = None
+        if vectorizer_changed:
+            self.vector_cache.clear()
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """规范化查询文本，用作缓存键"""
+        return ' '.join(query.split())
+
+    def _get_query_vectors(self, queries: List[str]):
+        """获取查询向量，未缓存的查询合并为一次向量化"""
+        rows = [self.vector_cache.get(query) for query in queries]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            vectors = self._vectorize_queries([queries[i] for i in missing])
+            for position, i in enumerate(missing):
+                rows[i] = vectors[position:position + 1].copy()
+                self.vector_cache.put(queries[i], rows[i])
+
+        if self.index_mode == 'sparse':
+            return sparse.vstack(rows, format='csr')
+        return np.vstack(rows)
+
+    @metrics.timed('vector.vectorize')
+    def _vectorize_queries(self, queries: List[str]):
+        """将查询文本转换为当前索引模式所需的向量"""
+        return self._prepare_vectors(self.vectorizer.transform_sparse(queries))
     
     def import_markdown_data(self, markdown_file_path: str) -> bool:
         """导入Markdown文档数据"""
@@ -265,50 +532,287 @@ class VectorHandler:
             logger.error(f"导入Markdown数据失败: {e}")
             return False
     
-    def semantic_search(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    def semantic_search(self, query: str, top_k: Optional[int] = None,
+                        filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """语义搜索"""
+        results = self.semantic_search_batch([query], top_k, filter)
+        formatted_results = results[0] if results else []
+        logger.info(f"语义搜索完成，查询: '{query}'，返回 {len(formatted_results)} 个结果")
+        return formatted_results
+
+    def semantic_search_batch(self, queries: List[str], top_k: Optional[int] = None,
+                              filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批量语义搜索：所有查询一次向量化、一次索引检索
+
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询返回结果数量
+            filter: 元数据过滤条件，如 {'source': 'appendix_a'}，只在满足条件的文档中检索
+
+        Returns:
+            与queries一一对应的结果列表
+        """
         try:
             if top_k is None:
                 top_k = self.config['retrieval_top_k']
 
+            if not queries:
+                return []
+
             if self.index is None or self.index.ntotal == 0:
                 logger.warning("向量数据库为空，无法进行搜索")
-                return []
+                return [[] for _ in queries]
 
             if not self.vectorizer.is_fitted:
                 logger.warning("向量化器未训练，无法进行搜索")
-                return []
+                return [[] for _ in queries]
+
+            # 先查结果缓存，相同的查询只检索一次
+            filter_key = repr(sorted(filter.items())) if filter else None
+            normalized_queries = [self._normalize_query(query) for query in queries]
+            all_results = [None] * len(queries)
+            pending = {}
+            for position, query in enumerate(normalized_queries):
+                cached = self.result_cache.get((query, top_k, filter_key, self.index_version))
+                if cached is not None:
+                    all_results[position] = self._copy_results(cached)
+                else:
+                    pending.setdefault(query, []).append(position)
+
+            if pending:
+                pending_queries = list(pending)
+                index_version = self.index_version
+
+                # 向量化查询
+                query_vectors = self._get_query_vectors(pending_queries)
+
+                # 有过滤条件时只在满足条件的文档子集中检索
+                allowed = self._filter_mask(filter) if filter else None
+                scores, indices = self._search_index(query_vectors, top_k, allowed)
+
+                for query, row_scores, row_indices in zip(pending_queries, scores, indices):
+                    formatted_results = self._format_search_results(row_scores, row_indices, top_k, filter)
+                    self.result_cache.put((query, top_k, filter_key, index_version), formatted_results)
+                    for position in pending[query]:
+                        all_results[position] = self._copy_results(formatted_results)
+
+            return all_results
 
-            # 向量化查询
-            query_vector = self.vectorizer.transform([query])
-            faiss.normalize_L2(query_vector)
+        except Exception as e:
+            logger.error(f"批量语义搜索失败: {e}")
+            return [[] for _ in queries]
+    
+    def rank_documents_batch(self, queries: List[str], top_k: Optional[int] = None,
+                             filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[int, float]]]:
+        """
+        批量语义检索，只返回 (文档序号, 相似度)，结果与 semantic_search_batch 一致
 
-            # 搜索
-            scores, indices = self.index.search(query_vector, min(top_k, self.index.ntotal))
+        不经过查询缓存，用于构建索引时预先计算大量检索结果
 
-            # 格式化结果
-            formatted_results = []
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                if idx >= 0 and idx < len(self.documents) and score > 0.1:  # 有效索引和最低分数阈值
-                    result = {
-                        'content': self.documents[idx],
-                        'metadata': self.metadata[idx],
-                        'score': float(score),  # FAISS返回的是相似度分数
-                        'distance': 1.0 - float(score),  # 转换为距离
-                        'id': self.metadata[idx].get('id', f'doc_{idx}')
-                    }
+        Returns:
+            与queries一一对应的 [(文档序号, 相似度), ...]
+        """
+        try:
+            if top_k is None:
+                top_k = self.config['retrieval_top_k']
 
-                    # 只返回相似度超过阈值的结果
-                    if score >= 0.1:  # 使用较低的阈值以确保能找到相关法规
-                        formatted_results.append(result)
+            if self.index is None or self.index.ntotal == 0 or not self.vectorizer.is_fitted:
+                return [[] for _ in queries]
 
-            logger.info(f"语义搜索完成，查询: '{query}'，返回 {len(formatted_results)} 个结果")
-            return formatted_results
+            allowed = self._filter_mask(filter) if filter else None
+            ranked = []
+            for start in range(0, len(queries), self.IMPORT_BATCH_SIZE):
+                batch = [self._normalize_query(query) for query in queries[start:start + self.IMPORT_BATCH_SIZE]]
+                scores, indices = self._search_index(self._vectorize_queries(batch), top_k, allowed)
+                ranked.extend(self._rank_search_results(row_scores, row_indices, top_k, filter)
+                              for row_scores, row_indices in zip(scores, indices))
+            return ranked
 
         except Exception as e:
-            logger.error(f"语义搜索失败: {e}")
-            return []
-    
+            logger.error(f"批量排序检索失败: {e}")
+            return [[] for _ in queries]
+
+    def get_documents(self, ranked: Sequence[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """按 (文档序号, 相似度) 取出文档，格式与检索结果相同"""
+        return self._copy_results([self._format_document(int(idx), float(score)) for idx, score in ranked])
+
+    def get_index_fingerprint(self) -> Optional[str]:
+        """
+        索引内容指纹：索引类型 + 段列表
+
+        段不可变且每次追加、合并都会生成新段，指纹相同即索引内容相同
+        """
+        if self.index is None or self.segments is None:
+            return None
+        names = ','.join(seg['name'] for seg in self.segments.manifest['segments'])
+        return f"{self.index_mode}:{self._index_signature()}:{len(self.documents)}:{names}"
+
+    def get_regulations_by_provisions(self, provision_numbers: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        按特殊规定编号直接查找附录A文档块（无需向量化）
+
+        Args:
+            provision_numbers: 特殊规定编号列表
+
+        Returns:
+            编号 -> 该规定的文档块列表（按块顺序）
+        """
+        try:
+            provision_index = self._get_provision_index()
+            results = {}
+            for number in provision_numbers:
+                doc_ids = provision_index.get(int(number), [])
+                results[int(number)] = [self._format_document(doc_id, 1.0) for doc_id in doc_ids]
+            return results
+
+        except Exception as e:
+            logger.error(f"按特殊规定编号查找法规失败: {e}")
+            return {}
+
+    def _get_provision_index(self) -> Dict[int, List[int]]:
+        """特殊规定编号 -> 文档序号列表（按索引版本懒加载）"""
+        if self._provision_index is not None:
+            return self._provision_index
+
+        provision_index = {}
+        section_provisions = {}
+        legacy_chunks = []
+        for doc_id in self.segments.find('source', 'appendix_a') if self.segments else []:
+            doc_id = int(doc_id)
+            metadata = self.metadata[doc_id]
+            number = metadata.get('provision_number')
+            if number is not None:
+                provision_index.setdefault(number, []).append(doc_id)
+                continue
+
+            # 旧数据没有编号元数据时，从各章节首块的正文中解析
+            if metadata.get('chunk_id') == 0:
+                number = TextProcessor.extract_provision_number(self.documents[doc_id])
+                if number is not None:
+                    section_provisions[metadata.get('section_id')] = number
+            legacy_chunks.append((doc_id, metadata.get('section_id')))
+
+        for doc_id, section_id in legacy_chunks:
+            number = section_provisions.get(section_id)
+            if number is not None:
+                provision_index.setdefault(number, []).append(doc_id)
+
+        self._provision_index = provision_index
+        return provision_index
+
+    def _format_document(self, idx: int, score: float) -> Dict[str, Any]:
+        """将文档格式化为检索结果"""
+        metadata = self.metadata[idx]
+        return {
+            'content': self.documents[idx],
+            'metadata': metadata,
+            'score': score,
+            'distance': 1.0 - score,
+            'id': metadata.get('id', f'doc_{idx}')
+        }
+
+    @metrics.timed('vector.index_search')
+    def _search_index(self, query_vectors, top_k: int, allowed: Optional[np.ndarray] = None):
+        """执行索引检索，allowed为可选的文档布尔掩码（预过滤）"""
+        if allowed is None:
+            return self.index.search(query_vectors, min(top_k, self.index.ntotal))
+
+        allowed_count = int(allowed.sum())
+        if allowed_count == 0:
+            empty = np.full((query_vectors.shape[0], 0), -1, dtype=np.int64)
+            return empty.astype('float32'), empty
+
+        k = min(top_k, allowed_count)
+        if self.index_mode == 'sparse':
+            return self.index.search(query_vectors, k, allowed=allowed)
+
+        # FAISS通过ID选择器只扫描子集中的文档
+        selector = faiss.IDSelectorBatch(np.flatnonzero(allowed).astype('int64'))
+        try:
+            return self.index.search(query_vectors, k, params=self._faiss_search_params(selector))
+        except (RuntimeError, TypeError) as e:
+            # 当前索引类型不支持ID选择器时退化为多取候选后过滤
+            logger.debug(f"索引不支持预过滤，改为后过滤: {e}")
+            return self.index.search(query_vectors, min(top_k * self.FILTER_OVERSAMPLE, self.index.ntotal))
+
+    def _faiss_search_params(self, selector):
+        """构造带ID选择器的FAISS检索参数（保留nprobe/efSearch设置）"""
+        try:
+            faiss.extract_index_ivf(self.index)
+            return faiss.SearchParametersIVF(sel=selector, nprobe=Settings.FAISS_NPROBE)
+        except RuntimeError:
+            pass
+        if isinstance(faiss.downcast_index(self.index), faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=Settings.FAISS_EF_SEARCH)
+        return faiss.SearchParameters(sel=selector)
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        计算满足过滤条件的文档布尔掩码（按索引版本缓存）
+
+        过滤条件的值可以是单个值，也可以是列表（满足其一即可）
+        """
+        cache_key = (repr(sorted(filter.items())), self.index_version)
+        mask = self._filter_masks.get(cache_key)
+        if mask is not None:
+            return mask
+
+        mask = np.ones(len(self.documents), dtype=bool)
+        for name, value in filter.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            column_mask = np.zeros(len(self.documents), dtype=bool)
+            for item in values:
+                column_mask[self.segments.find(name, item)] = True
+            mask &= column_mask
+
+        self._filter_masks[cache_key] = mask
+        return mask
+
+    @staticmethod
+    def _matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """判断元数据是否满足过滤条件"""
+        for name, value in filter.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if metadata.get(name) not in values:
+                return False
+        return True
+
+    def _format_search_results(self, scores, indices, top_k: int,
+                               filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """格式化单个查询的检索结果"""
+        return [self._format_document(idx, score) for idx, score in self._rank_search_results(scores, indices, top_k, filter)]
+
+    def _rank_search_results(self, scores, indices, top_k: int,
+                             filter: Optional[Dict[str, Any]]) -> List[Tuple[int, float]]:
+        """筛选单个查询的检索结果，返回 (文档序号, 相似度)"""
+        ranked = []
+        for score, idx in zip(scores, indices):
+            # 有效索引和最低分数阈值（使用较低的阈值以确保能找到相关法规）
+            if idx < 0 or idx >= len(self.documents) or score <= 0.1:
+                continue
+
+            if filter and not self._matches_filter(self.metadata[int(idx)], filter):
+                continue
+
+            ranked.append((int(idx), float(score)))  # FAISS返回的是相似度分数
+            if len(ranked) >= top_k:
+                break
+        return ranked
+
+    @staticmethod
+    def _copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """复制缓存中的结果，避免调用方修改缓存内容"""
+        return [dict(result, metadata=dict(result['metadata'])) for result in results]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取查询缓存统计信息"""
+        return {
+            'index_version': self.index_version,
+            'query_vectors': self.vector_cache.stats(),
+            'search_results': self.result_cache.stats()
+        }
+
     def get_collection_stats(self) -> Dict[str, Any]:
         """获取集合统计信息"""
         try:
@@ -329,9 +833,12 @@ class VectorHandler:
                 'total_documents': total_docs,
                 'collection_name': self.config['collection_name'],
                 'embedding_model': self.config['embedding_model'],
+                'index_mode': self.index_mode,
+                'index_factory': self._index_signature(),
                 'doc_types': doc_types,
                 'sources': sources,
-                'index_size': self.index.ntotal if self.index else 0
+                'index_size': self.index.ntotal if self.index else 0,
+                'cache': self.get_cache_stats()
             }
 
         except Exception as e:
@@ -343,13 +850,21 @@ class VectorHandler:
         try:
             logger.warning("正在重置向量数据库...")
 
-            # 删除现有文件
-            for file_path in [self.index_path, self.metadata_path, self.documents_path]:
+            # 删除现有文件（包括另一种索引模式的索引文件和向量化器，避免切换模式后加载过期的索引）
+            self._close_segments()
+            index_paths = [os.path.join(self.config['path'], index_file) for index_file in self.INDEX_FILES.values()]
+            for file_path in index_paths + [self.vectorizer_path, self.metadata_path, self.documents_path,
+                                            self.regulation_links_path]:
                 if os.path.exists(file_path):
                     os.remove(file_path)
+            for dir_path in [self.segments_path, self.store_path]:
+                if os.path.exists(dir_path):
+                    shutil.rmtree(dir_path)
 
             # 重新初始化
+            self.vectorizer = SimpleTfidfVectorizer()
             self._load_or_create_index()
+            self._bump_index_version(vectorizer_changed=True)
 
             logger.info("向量数据库重置完成")
             return True
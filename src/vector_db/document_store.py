@@ -0,0 +1,253 @@
+"""
+列式文档存储模块
+文本保存为连续的UTF-8数据块加偏移数组，元数据按类型分列保存，
+通过mmap按需读取，只有出现在结果中的文档才会被解码
+"""
+
+import os
+import json
+import mmap
+import shutil
+from collections.abc import Sequence
+from typing import List, Dict, Any, Iterable
+
+import numpy as np
+
+
+# 元数据单元格状态：字段缺失 / 值为None / 有值
+_ABSENT, _NULL, _PRESENT = 0, 1, 2
+
+# 唯一值数量不超过该阈值的字符串列使用字典编码
+_DICT_ENCODE_LIMIT = 1024
+
+
+class LazyRecordList(Sequence):
+    """由只读存储和内存追加部分组成的惰性列表"""
+
+    def __init__(self, getter=None, base_length: int = 0):
+        self._getter = getter
+        self._base_length = base_length
+        self._tail = []
+
+    def __len__(self):
+        return self._base_length + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("索引超出范围")
+        if index < self._base_length:
+            return self._getter(index)
+        return self._tail[index - self._base_length]
+
+    def extend(self, items: Iterable):
+        """追加记录（仅保存在内存中）"""
+        self._tail.extend(items)
+
+    def append(self, item):
+        """追加单条记录（仅保存在内存中）"""
+        self._tail.append(item)
+
+
+class _BlobColumn:
+    """变长UTF-8字符串列：连续数据块 + 偏移数组"""
+
+    def __init__(self, blob_path: str, offsets_path: str):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self._file = open(blob_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法mmap
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def get(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self._blob[start:end].decode('utf-8')
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+    @staticmethod
+    def write(blob_path: str, offsets_path: str, values: Iterable[str]):
+        offsets = [0]
+        with open(blob_path, 'wb') as f:
+            for value in values:
+                data = value.encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+
+
+class DocumentStore:
+    """基于mmap的只读列式文档存储"""
+
+    MANIFEST_FILE = 'store.json'
+    TEXT_BLOB = 'texts.bin'
+    TEXT_OFFSETS = 'texts.offsets.npy'
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, self.MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.count = self.manifest['count']
+        self._texts = _BlobColumn(os.path.join(path, self.TEXT_BLOB),
+                                  os.path.join(path, self.TEXT_OFFSETS))
+
+        # 按列打开元数据
+        self._columns = {}
+        for name, spec in self.manifest['columns'].items():
+            prefix = os.path.join(path, f"meta_{spec['file']}")
+            state = np.load(f"{prefix}.state.npy", mmap_mode='r')
+            if spec['type'] == 'str':
+                values = _BlobColumn(f"{prefix}.bin", f"{prefix}.offsets.npy")
+            elif spec['type'] == 'dict':
+                values = np.load(f"{prefix}.codes.npy", mmap_mode='r')
+            else:
+                values = np.load(f"{prefix}.values.npy", mmap_mode='r')
+            self._columns[name] = (spec, state, values)
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """判断目录中是否存在文档存储"""
+        return os.path.exists(os.path.join(path, cls.MANIFEST_FILE))
+
+    def get_text(self, index: int) -> str:
+        """读取单个文档文本"""
+        return self._texts.get(index)
+
+    def get_metadata(self, index: int) -> Dict[str, Any]:
+        """读取单个文档的元数据"""
+        metadata = {}
+        for name in self.manifest['column_order']:
+            spec, state, values = self._columns[name]
+            cell_state = state[index]
+            if cell_state == _ABSENT:
+                continue
+            if cell_state == _NULL:
+                metadata[name] = None
+            elif spec['type'] == 'str':
+                metadata[name] = values.get(index)
+            elif spec['type'] == 'dict':
+                metadata[name] = spec['dictionary'][values[index]]
+            elif spec['type'] == 'int':
+                metadata[name] = int(values[index])
+            else:
+                metadata[name] = json.loads(spec['values'][values[index]])
+        return metadata
+
+    def find(self, name: str, value: Any) -> np.ndarray:
+        """查找某个元数据字段等于value的文档序号"""
+        if name not in self._columns:
+            return np.empty(0, dtype=np.int64)
+
+        spec, state, values = self._columns[name]
+        if value is None:
+            return np.flatnonzero(state == _NULL)
+
+        present = state == _PRESENT
+        if spec['type'] == 'dict':
+            # 字典编码列直接比较编码数组
+            if value not in spec['dictionary']:
+                return np.empty(0, dtype=np.int64)
+            return np.flatnonzero(present & (values == spec['dictionary'].index(value)))
+        if spec['type'] == 'int':
+            if isinstance(value, bool) or not isinstance(value, int):
+                return np.empty(0, dtype=np.int64)
+            return np.flatnonzero(present & (values == value))
+
+        # 其他列逐行解码比较
+        return np.array([i for i in np.flatnonzero(present) if self.get_metadata(int(i)).get(name) == value],
+                        dtype=np.int64)
+
+    def texts(self) -> LazyRecordList:
+        """文本的惰性列表视图"""
+        return LazyRecordList(self.get_text, self.count)
+
+    def metadatas(self) -> LazyRecordList:
+        """元数据的惰性列表视图"""
+        return LazyRecordList(self.get_metadata, self.count)
+
+    def close(self):
+        """关闭底层mmap"""
+        self._texts.close()
+        for spec, _, values in self._columns.values():
+            if spec['type'] == 'str':
+                values.close()
+
+    @classmethod
+    def write(cls, path: str, documents: Sequence, metadatas: Sequence):
+        """将文档和元数据写入目录（目录已存在时先清空）"""
+        if len(documents) != len(metadatas):
+            raise ValueError("文档数量与元数据数量不一致")
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+        _BlobColumn.write(os.path.join(path, cls.TEXT_BLOB),
+                          os.path.join(path, cls.TEXT_OFFSETS), documents)
+
+        metadatas = list(metadatas)
+        column_order = []
+        for metadata in metadatas:
+            for key in metadata:
+                if key not in column_order:
+                    column_order.append(key)
+
+        columns = {}
+        for position, name in enumerate(column_order):
+            prefix = os.path.join(path, f"meta_{position}")
+            columns[name] = cls._write_column(prefix, [m.get(name) for m in metadatas],
+                                              [name in m for m in metadatas])
+            columns[name]['file'] = position
+
+        with open(os.path.join(path, cls.MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'count': len(metadatas), 'column_order': column_order, 'columns': columns},
+                      f, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def replace(src: str, dst: str):
+        """用新写入的存储目录替换旧目录（调用前需先关闭旧存储）"""
+        if os.path.exists(dst):
+            shutil.rmtree(dst)
+        os.replace(src, dst)
+
+    @staticmethod
+    def _write_column(prefix: str, values: List[Any], present: List[bool]) -> Dict[str, Any]:
+        """写入单个元数据列，返回列描述"""
+        state = np.array([_ABSENT if not p else (_NULL if v is None else _PRESENT)
+                          for v, p in zip(values, present)], dtype=np.uint8)
+        np.save(f"{prefix}.state.npy", state)
+        non_null = [v for v in values if v is not None]
+
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in non_null):
+            np.save(f"{prefix}.values.npy",
+                    np.array([v if v is not None else 0 for v in values], dtype=np.int64))
+            return {'type': 'int'}
+
+        if all(isinstance(v, str) for v in non_null):
+            dictionary = sorted(set(non_null))
+            if len(dictionary) <= _DICT_ENCODE_LIMIT and len(dictionary) * 4 <= max(len(non_null), 1):
+                codes = {value: i for i, value in enumerate(dictionary)}
+                np.save(f"{prefix}.codes.npy",
+                        np.array([codes.get(v, 0) for v in values], dtype=np.int32))
+                return {'type': 'dict', 'dictionary': dictionary}
+
+            _BlobColumn.write(f"{prefix}.bin", f"{prefix}.offsets.npy",
+                              (v if v is not None else '' for v in values))
+            return {'type': 'str'}
+
+        # 其他类型按JSON编码后字典化保存
+        encoded = [json.dumps(v, ensure_ascii=False) for v in values]
+        dictionary = sorted(set(encoded))
+        codes = {value: i for i, value in enumerate(dictionary)}
+        np.save(f"{prefix}.values.npy", np.array([codes[v] for v in encoded], dtype=np.int32))
+        return {'type': 'json', 'values': dictionary}
@@ -0,0 +1,166 @@
+"""
+分段存储模块
+每批新增文档写成一个不可变的段（列式文档 + TF-IDF稀疏向量），由一个小的manifest记录，
+追加的写入成本只与批次大小相关，合并（compaction）时才整体重写
+"""
+
+import os
+import json
+import shutil
+from bisect import bisect_right
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from src.vector_db.document_store import DocumentStore, LazyRecordList
+
+
+class SegmentStore:
+    """由manifest管理的追加式分段存储"""
+
+    MANIFEST_FILE = 'manifest.json'
+    VECTORS_FILE = 'vectors.npz'
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.manifest = self._read_manifest()
+        self.segments = [DocumentStore(os.path.join(path, seg['name']))
+                         for seg in self.manifest['segments']]
+        self._update_offsets()
+
+    def __len__(self):
+        return self._starts[-1]
+
+    @property
+    def segment_count(self) -> int:
+        """段数量"""
+        return len(self.segments)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'next_segment': 1, 'segments': [], 'indexed': {}}
+
+    def _write_manifest(self):
+        """原子地写入manifest"""
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, manifest_path)
+
+    def _update_offsets(self):
+        self._starts = [0]
+        for segment in self.segments:
+            self._starts.append(self._starts[-1] + len(segment))
+
+    def _locate(self, index: int):
+        position = bisect_right(self._starts, index) - 1
+        return self.segments[position], index - self._starts[position]
+
+    def get_text(self, index: int) -> str:
+        """读取单个文档文本"""
+        segment, local_index = self._locate(index)
+        return segment.get_text(local_index)
+
+    def get_metadata(self, index: int) -> Dict[str, Any]:
+        """读取单个文档的元数据"""
+        segment, local_index = self._locate(index)
+        return segment.get_metadata(local_index)
+
+    def find(self, name: str, value: Any) -> np.ndarray:
+        """查找所有段中某个元数据字段等于value的文档序号（全局序号）"""
+        matches = [segment.find(name, value) + start for segment, start in zip(self.segments, self._starts)]
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(matches)
+
+    def texts(self) -> LazyRecordList:
+        """所有段文本的惰性列表视图"""
+        return LazyRecordList(self.get_text, len(self))
+
+    def metadatas(self) -> LazyRecordList:
+        """所有段元数据的惰性列表视图"""
+        return LazyRecordList(self.get_metadata, len(self))
+
+    def load_vectors(self, start: int = 0) -> Optional[sparse.csr_matrix]:
+        """读取从第start个文档开始的所有向量"""
+        matrices = []
+        for seg, seg_start, seg_end in zip(self.manifest['segments'], self._starts, self._starts[1:]):
+            if seg_end <= start:
+                continue
+            matrix = sparse.load_npz(os.path.join(self.path, seg['name'], self.VECTORS_FILE))
+            matrices.append(matrix[max(start - seg_start, 0):])
+        if not matrices:
+            return None
+        return sparse.vstack(matrices, format='csr', dtype=np.float32)
+
+    def append(self, documents: Sequence[str], metadatas: Sequence[Dict], vectors) -> str:
+        """将一批文档写成新段，返回段名称"""
+        name = f"seg_{self.manifest['next_segment']:06d}"
+        self._write_segment(name, documents, metadatas, vectors)
+
+        self.manifest['next_segment'] += 1
+        self.manifest['segments'].append({'name': name, 'count': len(documents)})
+        self._write_manifest()
+
+        self.segments.append(DocumentStore(os.path.join(self.path, name)))
+        self._update_offsets()
+        return name
+
+    def compact(self) -> bool:
+        """将所有段合并为一个段，返回是否进行了合并"""
+        if len(self.segments) <= 1:
+            return False
+
+        name = f"seg_{self.manifest['next_segment']:06d}"
+        self._write_segment(name, self.texts(), self.metadatas(), self.load_vectors(0))
+
+        old_names = [seg['name'] for seg in self.manifest['segments']]
+        self.manifest['next_segment'] += 1
+        self.manifest['segments'] = [{'name': name, 'count': len(self)}]
+        self._write_manifest()
+
+        # manifest切换后再删除旧段
+        self.close()
+        for old_name in old_names:
+            shutil.rmtree(os.path.join(self.path, old_name), ignore_errors=True)
+
+        self.segments = [DocumentStore(os.path.join(self.path, name))]
+        self._update_offsets()
+        return True
+
+    def _write_segment(self, name: str, documents: Sequence[str], metadatas: Sequence[Dict], vectors):
+        """写入段目录（先写临时目录再重命名）"""
+        segment_path = os.path.join(self.path, name)
+        tmp_path = f"{segment_path}.tmp"
+        DocumentStore.write(tmp_path, documents, metadatas)
+        sparse.save_npz(os.path.join(tmp_path, self.VECTORS_FILE),
+                        sparse.csr_matrix(vectors, dtype=np.float32))
+        os.replace(tmp_path, segment_path)
+
+    def get_indexed_count(self, index_mode: str, signature: Optional[str] = None) -> int:
+        """已持久化到索引文件中的文档数量（索引类型签名不一致时视为0）"""
+        state = self.manifest['indexed'].get(index_mode)
+        if isinstance(state, int):
+            state = {'signature': None, 'count': state}
+        if not state or state.get('signature') != signature:
+            return 0
+        return state['count']
+
+    def set_indexed_count(self, index_mode: str, count: int, signature: Optional[str] = None):
+        """记录已持久化到索引文件中的文档数量及索引类型签名"""
+        self.manifest['indexed'][index_mode] = {'signature': signature, 'count': count}
+        self._write_manifest()
+
+    def close(self):
+        """关闭所有段的mmap"""
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self._update_offsets()
@@ -0,0 +1,92 @@
+"""
+稀疏倒排索引模块
+直接在TF-IDF稀疏矩阵上检索，只为与查询共享词项的文档计算得分
+"""
+
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+
+
+class SparseInvertedIndex:
+    """稀疏倒排索引（接口与FAISS索引的 add/search/ntotal 保持一致）"""
+
+    # 倒排索引无需训练
+    is_trained = True
+
+    def __init__(self, dimension: int):
+        self.d = dimension
+        # 倒排表：行为词项，列为文档，即 词项 -> (文档, 权重) 的postings
+        self.postings = sparse.csr_matrix((dimension, 0), dtype=np.float32)
+
+    @property
+    def ntotal(self) -> int:
+        """索引中的文档数量"""
+        return self.postings.shape[1]
+
+    def add(self, vectors):
+        """添加文档向量（CSR矩阵，每行一个文档，需已做L2标准化）"""
+        vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+        if vectors.shape[1] != self.d:
+            raise ValueError(f"向量维度不匹配: {vectors.shape[1]} != {self.d}")
+        self.postings = sparse.hstack([self.postings, vectors.T], format='csr', dtype=np.float32)
+
+    def search(self, queries, k: int, allowed: Optional[np.ndarray] = None):
+        """
+        检索与查询最相似的k个文档
+
+        Args:
+            queries: 查询向量（CSR矩阵）
+            k: 每个查询返回的文档数量
+            allowed: 可选的布尔掩码，只在掩码为True的文档中检索
+
+        Returns:
+            (scores, indices)，形状均为 (查询数, k)，不足k个时索引以-1填充
+        """
+        queries = sparse.csr_matrix(queries, dtype=np.float32)
+        n_queries = queries.shape[0]
+
+        scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        indices = np.full((n_queries, k), -1, dtype=np.int64)
+        if k <= 0 or self.ntotal == 0:
+            return scores, indices
+
+        # 稀疏矩阵乘法只遍历查询词项对应的postings
+        candidates = (queries @ self.postings).tocsr()
+
+        for row in range(n_queries):
+            start, end = candidates.indptr[row], candidates.indptr[row + 1]
+            if start == end:
+                continue
+
+            row_scores = candidates.data[start:end]
+            row_docs = candidates.indices[start:end]
+            if allowed is not None:
+                keep = allowed[row_docs]
+                row_scores, row_docs = row_scores[keep], row_docs[keep]
+                if len(row_scores) == 0:
+                    continue
+
+            if len(row_scores) > k:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+            else:
+                top = np.arange(len(row_scores))
+            top = top[np.argsort(-row_scores[top], kind='stable')]
+
+            scores[row, :len(top)] = row_scores[top]
+            indices[row, :len(top)] = row_docs[top]
+
+        return scores, indices
+
+    def save(self, path: str):
+        """保存索引到磁盘"""
+        sparse.save_npz(path, self.postings)
+
+    @classmethod
+    def load(cls, path: str) -> 'SparseInvertedIndex':
+        """从磁盘加载索引"""
+        postings = sparse.load_npz(path).tocsr().astype(np.float32)
+        index = cls(postings.shape[0])
+        index.postings = postings
+        return index